@@ -0,0 +1,386 @@
+"""
+Headless benchmark for the three app variants
+
+Builds main.HUDApp, main_clean.HUDApp and enhanced_ui.EnhancedHUDApp on a
+virtual display and times construction, switch toggles, theme changes and
+sync round-trips against a local stand-in device. Each app is also built
+with a synthetic HUD_CATALOG of CATALOG_SIZE switches, once virtualized and
+once fully built, to compare construction time, widget count and
+allocations, and rows of the virtualized list are toggled to check that
+settings, dirty tracking and recycled rows keep up. Percentiles are
+compared with bench_baseline.json; without a baseline the check fails,
+record one with --update first. An app that looks regressed is measured
+again, up to RETRIES times, and each op keeps its best p95, so a burst of
+load elsewhere on the machine does not fail the check. The baseline
+notes the platform, Python, Tk, customtkinter and X server it was
+recorded on, and a run on another setup says so.
+
+    python bench_app.py            run and check against the baseline
+    python bench_app.py --update   record the current numbers as baseline
+
+Without a DISPLAY an Xvfb server is started for the run.
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from hud_codec import FEATURE_TITLES
+
+BASELINE_PATH = Path(__file__).with_name("bench_baseline.json")
+TOLERANCE = 0.30  # allowed p95 growth over the baseline before the check fails
+SLACK_MS = 1.0  # plus this much, scheduler jitter alone is 30% of a 1 ms toggle
+# Sync results are picked up on the 60 Hz animation clock, so a round-trip
+# lands a whole frame later now and then
+OP_SLACK_MS = {"sync": 1000 / 60}
+RETRIES = 2  # extra runs of an app that looks regressed, each op keeps its best p95
+XVFB_DISPLAY = ":99"
+
+ITERATIONS = {
+    "construct": 8,
+    "toggle": 200,
+    "theme": 40,
+    "sync": 30,
+    "catalog": 4,
+    "catalog_toggle": 40,
+}
+
+CATALOG_SIZE = 500  # switches in the synthetic catalog, far past VIRTUALIZE_AFTER
+
+APPS = [
+    ("main", "HUDApp"),
+    ("main_clean", "HUDApp"),
+    ("enhanced_ui", "EnhancedHUDApp"),
+]
+
+
+def start_xvfb():
+    """Start Xvfb when there is no display, returns the process or None"""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise SystemExit("no DISPLAY and Xvfb is not installed")
+    proc = subprocess.Popen([xvfb, XVFB_DISPLAY, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = Path("/tmp/.X11-unix") / f"X{XVFB_DISPLAY[1:]}"
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    return proc
+
+
+def recording_setup(ctk, root):
+    """What the numbers were measured on, baselines only compare on the same setup"""
+    import platform
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "tk": root.tk.call("info", "patchlevel"),
+        "customtkinter": ctk.__version__,
+        "display": root.winfo_server(),
+    }
+
+
+def percentiles(samples):
+    """p50/p95/p99/max in milliseconds"""
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+
+def pump_until(root, done, timeout=5.0):
+    """Run the Tk loop until done() is true"""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("timed out waiting for the app")
+        root.update()
+
+
+def first_switch(app):
+    """A live switch to drive, from the plain list or the virtual one"""
+    if app.settings_list is not None:
+        return app.settings_list.rows[0].switch
+    return next(iter(app.setting_items.values())).switch
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def check_virtual_rows(app, titles, root):
+    """Scroll through the virtual list and check every bound row shows its own title"""
+    for fraction in (0.0, 0.37, 0.75, 1.0):
+        app.settings_list.yview("moveto", fraction)
+        root.update_idletasks()
+        for row, index in zip(app.settings_list.rows, app.settings_list.bound):
+            if index is not None and row.title != titles[index]:
+                raise RuntimeError(f"virtual row bound to {index} shows {row.title!r}")
+
+
+def toggle_catalog_rows(app, root, count=ITERATIONS["catalog_toggle"]):
+    """Toggle rows across the virtual list, returns the toggle times
+
+    Each toggle has to reach feature_states and the dirty set, rows moved
+    by a feature rule have to follow at once, and every recycled row has to
+    show its own feature's state once scrolled back.
+    """
+    virtual = app.settings_list
+
+    def check_bound_rows():
+        for row, index in zip(virtual.rows, virtual.bound):
+            if index is not None and (row.switch.get() == 1) != app.feature_states[row.title]:
+                raise RuntimeError(f"virtual row for {row.title!r} shows a stale switch state")
+
+    samples = []
+    for i in range(count):
+        virtual.yview("moveto", i / count)
+        root.update_idletasks()
+        index = virtual.offset // virtual.stride
+        row = virtual.rows[index % len(virtual.rows)]
+        title = row.title
+        before = app.feature_states[title]
+        start = time.perf_counter()
+        row.switch.toggle()
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+        if app.feature_states[title] == before or title not in app.dirty.dirty:
+            raise RuntimeError(f"toggling {title!r} in the virtual list did not change its setting")
+        check_bound_rows()
+    for fraction in (0.5, 0.0, 0.25, 1.0):
+        virtual.yview("moveto", fraction)
+        root.update_idletasks()
+        check_bound_rows()
+    return samples
+
+
+def bench_catalog(ctk, module, class_name, size=CATALOG_SIZE):
+    """Construction with a synthetic catalog, virtualized against fully built
+
+    The catalog is loaded from a HUD_CATALOG file, the way a vehicle line
+    with more options would ship it; the fully built run raises the app
+    module's VIRTUALIZE_AFTER past it.
+    """
+    app_class = getattr(module, class_name)
+    extras = [f"Synthetic feature {i:03d}" for i in range(size - len(FEATURE_TITLES))]
+    titles = FEATURE_TITLES + tuple(extras)
+    virtualize_after = module.VIRTUALIZE_AFTER
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = Path(tmp) / "catalog.json"
+        catalog_path.write_text(json.dumps({"features": extras}))
+        os.environ["HUD_CATALOG"] = str(catalog_path)
+        try:
+            for label, limit in (("virtual", virtualize_after), ("full", size)):
+                module.VIRTUALIZE_AFTER = limit
+                samples = []
+                for _ in range(ITERATIONS["catalog"]):
+                    root = ctk.CTk()
+                    start = time.perf_counter()
+                    app = app_class(root)
+                    root.update_idletasks()
+                    samples.append(time.perf_counter() - start)
+                    app.on_closing()
+
+                # One more build under tracemalloc, kept out of the timings
+                root = ctk.CTk()
+                tracemalloc.start()
+                app = app_class(root)
+                root.update_idletasks()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                widgets = count_widgets(root)
+                if label == "virtual":
+                    if app.settings_list is None or len(app.features) != size:
+                        raise RuntimeError(f"{module.__name__}: {size} switches were not virtualized")
+                    check_virtual_rows(app, titles, root)
+                    results["catalog_toggle"] = percentiles(toggle_catalog_rows(app, root))
+                app.on_closing()
+                results[f"catalog_{label}"] = dict(percentiles(samples), widgets=widgets, peak_kib=peak / 1024)
+        finally:
+            module.VIRTUALIZE_AFTER = virtualize_after
+            os.environ.pop("HUD_CATALOG", None)
+    return results
+
+
+def bench_app(ctk, module, class_name):
+    app_class = getattr(module, class_name)
+    results = {}
+
+    # Construction, including the first layout pass
+    samples = []
+    for _ in range(ITERATIONS["construct"]):
+        root = ctk.CTk()
+        start = time.perf_counter()
+        app = app_class(root)
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+        app.on_closing()
+    results["construct"] = percentiles(samples)
+
+    root = ctk.CTk()
+    app = app_class(root)
+    root.update()
+
+    # Toggle end to end: switch command -> _handle_toggle -> on_feature_change -> redraw
+    switch = first_switch(app)
+    samples = []
+    for _ in range(ITERATIONS["toggle"]):
+        start = time.perf_counter()
+        switch.toggle()
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+    results["toggle"] = percentiles(samples)
+
+    # Theme switch including the repaint it triggers
+    names = list(app.themes)
+    samples = []
+    for i in range(ITERATIONS["theme"]):
+        start = time.perf_counter()
+        app.change_theme(names[(i + 1) % len(names)])
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+    results["theme"] = percentiles(samples)
+
+    # Sync round-trip, button press until sync_complete ran
+    completed = []
+    sync_complete = app.sync_complete
+
+    def record(result):
+        sync_complete(result)
+        completed.append(result.ok)
+
+    app.sync_complete = record
+    samples = []
+    for _ in range(ITERATIONS["sync"]):
+        switch.toggle()
+        done = len(completed) + 1
+        start = time.perf_counter()
+        app.sync_settings()
+        pump_until(root, lambda: len(completed) >= done)
+        samples.append(time.perf_counter() - start)
+    if not all(completed):
+        raise RuntimeError(f"{module.__name__}: sync failed against the stand-in device")
+    results["sync"] = percentiles(samples)
+
+    app.on_closing()
+    return results
+
+
+def run_app(ctk, module, class_name):
+    """Every measurement for one app variant"""
+    results = bench_app(ctk, module, class_name)
+    results.update(bench_catalog(ctk, module, class_name))
+    return results
+
+
+def regressions(ops, baseline):
+    """Ops whose p95 grew past the baseline's by more than the tolerance"""
+    return [op for op, stats in ops.items() if op in baseline
+            and stats["p95"] > baseline[op]["p95"] * (1 + TOLERANCE) + OP_SLACK_MS.get(op, SLACK_MS)]
+
+
+def main():
+    update = "--update" in sys.argv
+    xvfb = start_xvfb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the run away from the user's settings, font and asset caches and device
+        os.environ["HUD_SETTINGS_FILE"] = str(Path(tmp) / "settings.json")
+        os.environ["HUD_FONT_CACHE"] = str(Path(tmp) / "fonts.json")
+        os.environ["HUD_ASSET_CACHE"] = str(Path(tmp) / "assets")
+        os.environ.pop("HUD_AUTO_SYNC", None)
+        os.environ.pop("HUD_CATALOG", None)
+
+        from hud_sync import start_device
+        tcp, udp = start_device(0, verbose=False)
+        os.environ["HUD_DEVICE"] = f"tcp://127.0.0.1:{tcp.server_address[1]}"
+
+        import importlib
+        import customtkinter as ctk
+        from hud_fonts import font_pool_report
+
+        root = ctk.CTk()
+        setup = recording_setup(ctk, root)
+        root.destroy()
+
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        recorded = baseline.pop("recorded_on", None)
+
+        current = {}
+        try:
+            for module_name, class_name in APPS:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    module = importlib.import_module(module_name)
+                    ops = run_app(ctk, module, class_name)
+                    # A burst of load elsewhere can stretch a whole run's tail,
+                    # measure again before calling it a regression
+                    for _ in range(0 if update else RETRIES):
+                        if not regressions(ops, baseline.get(module_name, {})):
+                            break
+                        again = run_app(ctk, module, class_name)
+                        ops = {op: min(stats, again[op], key=lambda s: s["p95"]) for op, stats in ops.items()}
+                current[module_name] = ops
+        finally:
+            tcp.shutdown()
+            udp.shutdown()
+            if xvfb is not None:
+                xvfb.terminate()
+
+    if baseline and recorded != setup:
+        print(f"note: baseline recorded on {recorded}, this run is on {setup}, expect drift")
+    failed = []
+    print(f"{'app':<12} {'op':<16} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  baseline p95 (ms)")
+    for module_name, ops in current.items():
+        regressed = regressions(ops, baseline.get(module_name, {}))
+        for op, stats in ops.items():
+            base = baseline.get(module_name, {}).get(op)
+            line = f"{module_name:<12} {op:<16} " + " ".join(f"{stats[k]:8.2f}" for k in ("p50", "p95", "p99", "max"))
+            if base:
+                line += f"  {base['p95']:8.2f}"
+                if op in regressed:
+                    line += "  REGRESSION"
+                    failed.append(f"{module_name}.{op}")
+            print(line)
+    for module_name, ops in current.items():
+        virtual, full = ops["catalog_virtual"], ops["catalog_full"]
+        print(f"{module_name:<12} {CATALOG_SIZE} switches: virtualized {virtual['p50']:.0f} ms, "
+              f"{virtual['widgets']} widgets, {virtual['peak_kib']:.0f} KiB; fully built "
+              f"{full['p50']:.0f} ms, {full['widgets']} widgets, {full['peak_kib']:.0f} KiB; "
+              f"toggle p95 {ops['catalog_toggle']['p95']:.1f} ms")
+    print(font_pool_report())
+
+    if update:
+        BASELINE_PATH.write_text(json.dumps(dict(recorded_on=setup, **current), indent=2) + "\n")
+        print(f"baseline written to {BASELINE_PATH.name}")
+        return 0
+    if not baseline:
+        print("FAIL: no baseline to check against, run with --update on a reference machine first")
+        return 1
+    missing = [f"{module_name}.{op}" for module_name, ops in current.items()
+               for op in ops if op not in baseline.get(module_name, {})]
+    if missing:
+        failed.extend(missing)
+        print(f"no baseline for {', '.join(missing)}, re-record with --update")
+    if failed:
+        print(f"FAIL: p95 regressions in {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
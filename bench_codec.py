@@ -0,0 +1,68 @@
+"""
+Throughput benchmark for the HUD settings codec, one frame per call
+and the numpy batch path
+
+    python bench_codec.py [count]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from hud_codec import (ALL_FEATURES, FEATURE_TITLES, THEME_NAMES, decode_frame, decode_frames,
+                       decode_snapshot, encode_frame, encode_frames, encode_snapshot)
+
+
+def bench(label, func, items):
+    """Run func over items and print the rate"""
+    start = time.perf_counter()
+    for item in items:
+        func(*item)
+    elapsed = time.perf_counter() - start
+    report(label, len(items), elapsed)
+
+
+def bench_batch(label, func, args, count):
+    """Time one call handling count frames at once"""
+    start = time.perf_counter()
+    func(*args)
+    report(label, count, time.perf_counter() - start)
+
+
+def report(label, count, elapsed):
+    print(f"{label:<22} {count / elapsed / 1e6:6.2f} M/s  ({elapsed * 1e9 / count:5.0f} ns each)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(0)
+
+    packed = [(seq, rng.getrandbits(len(FEATURE_TITLES)), rng.randrange(len(THEME_NAMES)))
+              for seq in range(count)]
+    frames = [(encode_frame(*fields),) for fields in packed]
+    snapshots = [({title: bool(mask >> i & 1) for i, title in enumerate(FEATURE_TITLES)},
+                  THEME_NAMES[theme], seq)
+                 for seq, mask, theme in packed[:count // 10]]
+    snapshot_frames = [(encode_snapshot(*snapshot),) for snapshot in snapshots]
+
+    # Round-trip check before timing anything
+    for (seq, mask, theme), (frame,) in zip(packed, frames):
+        assert decode_frame(frame) == (seq, True, mask, ALL_FEATURES, theme)
+
+    print(f"{count:,} frames, {len(frames[0][0])} bytes each")
+    bench("encode_frame", encode_frame, packed)
+    bench("decode_frame", decode_frame, frames)
+    bench("encode_snapshot", encode_snapshot, snapshots)
+    bench("decode_snapshot", decode_snapshot, snapshot_frames)
+
+    seqs, masks, themes = (np.array(column) for column in zip(*packed))
+    blob = encode_frames(seqs, masks, themes)
+    assert blob == b"".join(frame for frame, in frames)
+    bench_batch("encode_frames", encode_frames, (seqs, masks, themes), count)
+    bench_batch("decode_frames", decode_frames, (blob,), count)
+
+
+if __name__ == "__main__":
+    main()
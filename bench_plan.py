@@ -0,0 +1,59 @@
+"""
+Fleet diff planner benchmark on a synthetic fleet
+
+    python bench_plan.py [vehicles]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from hud_codec import ALL_FEATURES, FEATURE_TITLES, THEME_NAMES, unpack_features
+from hud_plan import FleetPlan, FleetState
+from hud_rules import RULES
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<18} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    target_mask = 0b10110101101
+    # Most of a real fleet is already close to the profile: flip a few random bits
+    flips = np.zeros(count, dtype=np.uint16)
+    for _ in range(3):
+        flips |= np.where(rng.random(count) < 0.3, 1 << rng.integers(0, len(FEATURE_TITLES), count), 0).astype(np.uint16)
+    fleet = FleetState(np.uint16(target_mask) ^ flips & ALL_FEATURES,
+                       rng.integers(0, len(THEME_NAMES), count) * (rng.random(count) < 0.1))
+
+    print(f"{count:,} vehicles")
+    start = time.perf_counter()
+    plan = timed("diff", lambda: FleetPlan(fleet, unpack_features(target_mask), THEME_NAMES[0]))
+    timed("feature changes", plan.feature_changes)
+    timed("histogram", plan.change_histogram)
+    batches = timed("batches", plan.batches)
+    print(f"{'total':<18} {(time.perf_counter() - start) * 1000:8.1f} ms, "
+          f"{plan.outdated:,} outdated in {len(batches):,} batches")
+
+    valid = timed("rules check", lambda: RULES.valid_masks(fleet.masks))
+    masks = fleet.masks.tolist()
+    start = time.perf_counter()
+    assert sum(map(RULES.valid, masks)) == int(valid.sum())
+    print(f"{'rules check, scalar':<18} {count / (time.perf_counter() - start) / 1e6:8.1f} M/s")
+
+    # Spot-check against the obvious per-vehicle loop
+    for row in rng.integers(0, count, 1000):
+        diff = int(fleet.masks[row]) ^ target_mask
+        assert plan.changes[row] == bin(diff).count("1")
+        assert plan.needs_update[row] == bool(diff or fleet.themes[row])
+    assert sum(len(batch.vehicles) for batch in batches) == plan.outdated
+
+
+if __name__ == "__main__":
+    main()
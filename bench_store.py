@@ -0,0 +1,55 @@
+"""
+Load-path benchmark for the settings store, fails when over budget
+
+    python bench_store.py [budget_ms]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from hud_codec import FEATURE_TITLES
+from hud_store import load_settings, save_settings
+
+RUNS = 2000
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "hud_settings.json"
+        states = {title: i % 2 == 0 for i, title in enumerate(FEATURE_TITLES)}
+        save_settings(states, "Nature", states, "Nature", path=path)
+        assert load_settings(path)["features"] == states
+
+        samples = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            load_settings(path)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        save_start = time.perf_counter()
+        save_settings(states, "Nature", states, "Nature", path=path)
+        save_ms = (time.perf_counter() - save_start) * 1000
+        size = os.path.getsize(path)
+
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"file {size} bytes, {RUNS} loads")
+    print(f"load  p50 {p50:.3f} ms  p99 {p99:.3f} ms  max {samples[-1]:.3f} ms  (budget {budget_ms} ms)")
+    print(f"save  {save_ms:.3f} ms (atomic replace with fsync)")
+
+    if p99 > budget_ms:
+        print("FAIL: load path over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,25 @@
 import customtkinter as ctk
 import tkinter as tk
+from PIL import ImageTk
 from tkinter import Canvas
 import math
-import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageTk
 import os
+import time
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 
+from hud_assets import ASSETS
+from hud_clock import clock_for
+from hud_fonts import pooled_font
+from hud_metrics import DIAGNOSTICS, diagnostics_text
+from hud_profile import profiler_from_env
+from hud_rules import RULES, side_effects
+from hud_store import load_catalog, load_settings, save_settings
+from hud_sync import SYNC_STAGES, DirtyTracker, SyncEngine, auto_sync_from_env
+from hud_watchdog import watchdog_from_env
+from virtual_list import VIRTUALIZE_AFTER, VirtualList
+
 # High-quality rendering settings
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -18,76 +31,165 @@ try:
 except:
     pass
 
+@lru_cache(maxsize=256)
+def rounded_rect_points(width, height, radius):
+    """Smoothed-polygon points for a rounded rect at the origin, cached per size"""
+    points = []
+    for x, y in [(0, radius), (0, 0), (radius, 0),
+                 (width - radius, 0), (width, 0), (width, radius),
+                 (width, height - radius), (width, height), (width - radius, height),
+                 (radius, height), (0, height), (0, height - radius)]:
+        points.extend([x, y])
+    return tuple(points)
+
+
 class DynamicIsland(tk.Canvas):
-    """Dynamic Island component for iPhone-like experience"""
+    """Dynamic Island component for iPhone-like experience
+    
+    The shape, label and indicator are created once and moved with
+    coords()/itemconfigure(). Size changes are eased over
+    TRANSITION_MS on the root's animation clock, frame times are kept for frame_stats().
+    The shape is two anti-aliased end caps cut from an asset cache sprite
+    with a plain rectangle between them, at rest and in every transition
+    frame alike, so the outline never changes curve and a frame only needs
+    new sprites when the height does.
+    """
+    COMPACT_SIZE = (120, 32)
+    EXPANDED_SIZE = (200, 40)
+    TRANSITION_MS = 250
+    MESSAGE = "HUD Control Active"
+    COLOR = "#1C1C1E"
+    
     def __init__(self, parent, **kwargs):
         super().__init__(parent, **kwargs)
         self.configure(highlightthickness=0, bg="black")
         
         # Island properties
-        self.island_width = 120
-        self.island_height = 32
+        self.island_width, self.island_height = self.COMPACT_SIZE
         self.corner_radius = 16
         self.is_expanded = False
         
+        # Animation state
+        self.clock = clock_for(self._root())
+        self.transition = None
+        self.frame_times = deque(maxlen=240)
+        self.last_frame = None
+        
+        # Persistent items, positioned by draw_island
+        self.left_cap = self.create_image(0, 0, anchor="nw")
+        self.right_cap = self.create_image(0, 0, anchor="nw")
+        self.middle = self.create_rectangle(0, 0, 0, 0, fill=self.COLOR, outline="")
+        self.caps = {}
+        self.shown_caps = None
+        self.label = self.create_text(
+            0, 0,
+            text=self.MESSAGE,
+            fill="white",
+            font=("Segoe UI", 10, "bold"),
+            state="hidden"
+        )
+        self.dot = self.create_oval(0, 0, 0, 0, fill="#32D74B", outline="")
+        
         self.draw_island()
         self.bind("<Button-1>", self.toggle_island)
+        self.bind("<Configure>", lambda event: self.draw_island(), add="+")
         
     def draw_island(self):
-        self.delete("all")
-        
+        """Move the persistent items to the current size and state"""
         # Calculate position (centered)
-        canvas_width = self.winfo_width() or 200
+        canvas_width = self.winfo_width()
+        if canvas_width <= 1:
+            canvas_width = 200
         x = (canvas_width - self.island_width) // 2
         y = 8
         
-        # Draw rounded rectangle for island
-        self.create_rounded_rect(
-            x, y, x + self.island_width, y + self.island_height,
-            radius=self.corner_radius,
-            fill="#1C1C1E",
-            outline=""
-        )
-        
-        # Add content based on state
-        if self.is_expanded:
-            # Expanded state - show more info
-            self.create_text(
-                canvas_width // 2, y + self.island_height // 2,
-                text="HUD Control Active",
-                fill="white",
-                font=("Segoe UI", 10, "bold")
-            )
-        else:
-            # Compact state - show indicator
-            dot_x = canvas_width // 2
-            dot_y = y + self.island_height // 2
-            self.create_oval(
-                dot_x - 3, dot_y - 3, dot_x + 3, dot_y + 3,
-                fill="#32D74B", outline=""
+        radius = min(self.corner_radius, self.island_height // 2, self.island_width // 2)
+        caps = self.island_caps(radius)
+        if caps is not self.shown_caps:
+            self.itemconfigure(self.left_cap, image=caps[0])
+            self.itemconfigure(self.right_cap, image=caps[1])
+            self.shown_caps = caps
+        self.coords(self.left_cap, x, y)
+        self.coords(self.right_cap, x + self.island_width - radius, y)
+        self.coords(self.middle, x + radius, y, x + self.island_width - radius, y + self.island_height)
+        
+        # Content only shows once the island has settled
+        settled = self.transition is None
+        center_x = canvas_width // 2
+        center_y = y + self.island_height // 2
+        self.coords(self.label, center_x, center_y)
+        self.itemconfigure(self.label, state="normal" if settled and self.is_expanded else "hidden")
+        self.coords(self.dot, center_x - 3, center_y - 3, center_x + 3, center_y + 3)
+        self.itemconfigure(self.dot, state="normal" if settled and not self.is_expanded else "hidden")
+    
+    def set_message(self, text=None):
+        """Text shown while expanded, the default message when None"""
+        self.itemconfigure(self.label, text=text or self.MESSAGE)
+    
+    def island_caps(self, radius):
+        """(left, right) cap PhotoImages for the current height, one pair per height
+        
+        The sprite is two pixels wider than its corners, which makes the
+        caps pixel for pixel the ends of a full-width render.
+        """
+        height = self.island_height
+        caps = self.caps.get((height, radius))
+        if caps is None:
+            image = ASSETS.get("island", (2 * radius + 2, height), radius, self.COLOR)
+            caps = self.caps[(height, radius)] = (
+                ImageTk.PhotoImage(image.crop((0, 0, radius, height)), master=self),
+                ImageTk.PhotoImage(image.crop((radius + 2, 0, 2 * radius + 2, height)), master=self),
             )
+        return caps
     
     def create_rounded_rect(self, x1, y1, x2, y2, radius=10, **kwargs):
         """Create a rounded rectangle"""
-        points = []
-        for x, y in [(x1, y1 + radius), (x1, y1), (x1 + radius, y1),
-                     (x2 - radius, y1), (x2, y1), (x2, y1 + radius),
-                     (x2, y2 - radius), (x2, y2), (x2 - radius, y2),
-                     (x1 + radius, y2), (x1, y2), (x1, y2 - radius)]:
-            points.extend([x, y])
-        return self.create_polygon(points, smooth=True, **kwargs)
+        points = rounded_rect_points(x2 - x1, y2 - y1, radius)
+        return self.create_polygon(
+            [value + (x1 if i % 2 == 0 else y1) for i, value in enumerate(points)],
+            smooth=True, **kwargs
+        )
     
     def toggle_island(self, event=None):
         """Toggle island expanded state"""
         self.is_expanded = not self.is_expanded
-        if self.is_expanded:
-            self.island_width = 200
-            self.island_height = 40
+        target = self.EXPANDED_SIZE if self.is_expanded else self.COMPACT_SIZE
+        # A toggle mid-transition reverses from wherever the island is now
+        self.transition = ((self.island_width, self.island_height), target, time.perf_counter())
+        if self.last_frame is None:
+            self.last_frame = time.perf_counter()
+            self.clock.add(self._animate)
+        self.draw_island()
+    
+    def _animate(self, now):
+        self.frame_times.append((now - self.last_frame) * 1000)
+        (start_w, start_h), (end_w, end_h), started = self.transition
+        progress = min(1.0, (now - started) * 1000 / self.TRANSITION_MS)
+        eased = 1 - (1 - progress) ** 3
+        
+        # Whole pixels keep the point cache small and the edges crisp
+        self.island_width = round(start_w + (end_w - start_w) * eased)
+        self.island_height = round(start_h + (end_h - start_h) * eased)
+        if progress >= 1.0:
+            self.transition = None
+            self.last_frame = None
         else:
-            self.island_width = 120
-            self.island_height = 32
-        
-        self.after(10, self.draw_island)
+            self.last_frame = now
+        self.draw_island()
+        return self.transition is not None
+    
+    def frame_stats(self):
+        """Frame intervals of recent transitions in ms, dropped = over 1.5 frames"""
+        times = sorted(self.frame_times)
+        if not times:
+            return {"frames": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "dropped": 0}
+        return {
+            "frames": len(times),
+            "mean_ms": sum(times) / len(times),
+            "p95_ms": times[min(len(times) - 1, int(0.95 * len(times)))],
+            "max_ms": times[-1],
+            "dropped": sum(1 for t in times if t > self.clock.frame_ms * 1.5),
+        }
 
 class RoundedFrame(ctk.CTkFrame):
     """Enhanced frame with better anti-aliasing"""
@@ -117,8 +219,10 @@ class PhoneFrame(tk.Frame):
 
 class EnhancedSwitch(ctk.CTkSwitch):
     """Enhanced switch with better rendering"""
-    def __init__(self, parent, callback=None, **kwargs):
+    def __init__(self, parent, callback=None, is_on=False, **kwargs):
         self._callback = callback
+        # Start in the saved state instead of toggling after construction
+        kwargs.setdefault("variable", ctk.IntVar(parent, value=1 if is_on else 0))
         super().__init__(parent, command=self._handle_toggle, **kwargs)
         
         # Enhanced visual properties
@@ -138,11 +242,18 @@ class EnhancedSwitch(ctk.CTkSwitch):
     def _handle_toggle(self):
         if self._callback:
             self._callback(self.get() == 1)
+            
+    def set_state(self, state):
+        """Set switch state programmatically"""
+        if state:
+            self.select()
+        else:
+            self.deselect()
 
 class EnhancedSettingItem(RoundedFrame):
     """Enhanced setting item with better anti-aliasing"""
     def __init__(self, parent, title, has_switch=True, has_arrow=False, 
-                 status_text="", callback=None, **kwargs):
+                 status_text="", callback=None, is_on=False, **kwargs):
         super().__init__(parent, corner_radius=14, **kwargs)
         
         self.title = title
@@ -150,7 +261,7 @@ class EnhancedSettingItem(RoundedFrame):
         self.has_arrow = has_arrow
         self.status_text = status_text
         self.callback = callback
-        self.is_active = False
+        self.is_active = is_on
         
         self.configure(height=56, fg_color=("#2b2b2b", "#2b2b2b"))
         self.grid_propagate(False)
@@ -163,7 +274,7 @@ class EnhancedSettingItem(RoundedFrame):
         self.title_label = ctk.CTkLabel(
             self, 
             text=self.title,
-            font=ctk.CTkFont(size=16, weight="bold"),
+            font=pooled_font(size=16, weight="bold"),
             text_color=("#FFFFFF", "#FFFFFF"),
             anchor="w"
         )
@@ -173,17 +284,17 @@ class EnhancedSettingItem(RoundedFrame):
             self.status_label = ctk.CTkLabel(
                 self,
                 text=self.status_text,
-                font=ctk.CTkFont(size=14, weight="bold"),
+                font=pooled_font(size=14, weight="bold"),
                 text_color=("#8E8E93", "#8E8E93")
             )
             self.status_label.grid(row=0, column=2, padx=(0, 15), pady=14, sticky="e")
         
         if self.has_switch:
-            self.switch = EnhancedSwitch(self, callback=self.on_switch_change)
+            self.switch = EnhancedSwitch(self, callback=self.on_switch_change, is_on=self.is_active)
             self.switch.grid(row=0, column=3, padx=(0, 20), pady=14, sticky="e")
         elif self.has_arrow:
             arrow_label = ctk.CTkLabel(
-                self, text="›", font=ctk.CTkFont(size=20, weight="bold"),
+                self, text="›", font=pooled_font(size=20, weight="bold"),
                 text_color=("#8E8E93", "#8E8E93")
             )
             arrow_label.grid(row=0, column=3, padx=(0, 20), pady=14, sticky="e")
@@ -193,27 +304,31 @@ class EnhancedSettingItem(RoundedFrame):
         if self.callback:
             self.callback(self.title, is_on)
 
+    def bind_feature(self, title, is_on):
+        """Point a recycled row at another feature without firing callbacks"""
+        self.title = title
+        self.is_active = is_on
+        self.title_label.configure(text=title)
+        self.switch.set_state(is_on)
+
 class EnhancedHUDApp:
     def __init__(self, root):
         self.root = root
+        # Opt-in stall watchdog (HUD_WATCHDOG), handlers are wrapped before any widget holds them
+        self.watchdog = watchdog_from_env(root)
+        if self.watchdog:
+            self.watchdog.instrument(self, "setup_enhanced_window", "create_enhanced_interface", "on_feature_change",
+                                     "change_theme", "sync_settings", "sync_progress", "sync_complete")
         self.setup_enhanced_window()
         
         # Feature configuration
-        self.features = [
-            {"title": "Rear Traffic Alert", "type": "switch"},
-            {"title": "Headlight Status", "type": "switch"},
-            {"title": "Turn Signals", "type": "switch"},
-            {"title": "Navigation", "type": "switch"},
-            {"title": "Speed Limits", "type": "switch"},
-            {"title": "Takeover Alerts", "type": "switch"},
-            {"title": "Lane Departure", "type": "switch"},
-            {"title": "Autopilot Status", "type": "switch"},
-            {"title": "Gear Position", "type": "switch"},
-            {"title": "Battery Range", "type": "switch"},
-            {"title": "Speed Display", "type": "switch"}
-        ]
-        
-        self.feature_states = {feature["title"]: False for feature in self.features}
+        # Codec titles first, in frame bit order, then any HUD_CATALOG extras
+        self.catalog = load_catalog()
+        self.features = [{"title": title, "type": "switch"} for title in self.catalog]
+        
+        # Saved settings are loaded before any widget exists
+        self.settings = load_settings(titles=self.catalog)
+        self.feature_states = self.settings["features"]
         self.setting_items = {}
         
         self.themes = {
@@ -223,7 +338,14 @@ class EnhancedHUDApp:
             "Cyber": {"name": "Cyber", "color": "#FF0080"}
         }
         
-        self.current_theme = "Dark"
+        self.current_theme = self.settings["theme"]
+        
+        # Device link, runs on its own worker thread
+        self.sync_engine = SyncEngine(self.root)
+        self.dirty = DirtyTracker(self.feature_states, self.current_theme,
+                                  self.settings["synced"], self.settings["synced_theme"])
+        # Without a usable device address there is nothing to sync automatically
+        self.auto_sync = None if self.sync_engine.error else auto_sync_from_env(self.root, self.sync_settings)
         
         self.create_enhanced_interface()
         
@@ -233,6 +355,7 @@ class EnhancedHUDApp:
         self.root.geometry("440x780")
         self.root.configure(bg="#000000")
         self.root.resizable(False, False)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         # Create phone frame with curved edges
         self.phone_frame = PhoneFrame(self.root)
@@ -281,7 +404,7 @@ class EnhancedHUDApp:
         self.title_label = ctk.CTkLabel(
             header_frame,
             text="Settings",
-            font=ctk.CTkFont(size=28, weight="bold"),
+            font=pooled_font(size=28, weight="bold"),
             text_color=("#FFFFFF", "#FFFFFF")
         )
         self.title_label.grid(row=0, column=0, sticky="w", pady=(10, 0))
@@ -303,6 +426,18 @@ class EnhancedHUDApp:
         )
         version_item.pack(fill="x", padx=0, pady=0)
         
+        # Sync metrics row, opt-in with HUD_DIAGNOSTICS=1
+        self.diagnostics_label = None
+        if DIAGNOSTICS:
+            self.diagnostics_label = ctk.CTkLabel(
+                status_container,
+                text=diagnostics_text(self.sync_engine.metrics),
+                font=pooled_font(size=12),
+                text_color=("#8E8E93", "#8E8E93"),
+                anchor="w"
+            )
+            self.diagnostics_label.pack(fill="x", padx=20, pady=(0, 10))
+        
     def create_enhanced_settings_section(self):
         """Create enhanced settings section"""
         settings_container = RoundedFrame(
@@ -312,16 +447,32 @@ class EnhancedHUDApp:
         )
         settings_container.grid(row=2, column=0, sticky="ew", padx=15, pady=(0, 15))
         
-        for i, feature in enumerate(self.features):
-            if feature["type"] == "switch":
+        switch_titles = [feature["title"] for feature in self.features if feature["type"] == "switch"]
+        if len(switch_titles) > VIRTUALIZE_AFTER:
+            # Large catalogs only build rows for the viewport and recycle them
+            self.settings_list = VirtualList(
+                settings_container,
+                switch_titles,
+                row_factory=lambda parent: EnhancedSettingItem(
+                    parent, "", has_switch=True, callback=self.on_feature_change
+                ),
+                bind_row=lambda item, title: item.bind_feature(title, self.feature_states[title]),
+                row_height=56,
+                fg_color="transparent"
+            )
+            self.settings_list.pack(fill="x", padx=0, pady=0)
+        else:
+            self.settings_list = None
+            for title in switch_titles:
                 item = EnhancedSettingItem(
                     settings_container, 
-                    feature["title"],
+                    title,
                     has_switch=True, 
-                    callback=self.on_feature_change
+                    callback=self.on_feature_change,
+                    is_on=self.feature_states[title]
                 )
                 item.pack(fill="x", padx=0, pady=(0, 1))
-                self.setting_items[feature["title"]] = item
+                self.setting_items[title] = item
                 
         # Separator
         separator = ctk.CTkFrame(
@@ -360,7 +511,7 @@ class EnhancedHUDApp:
         theme_title = ctk.CTkLabel(
             theme_container,
             text="Theme",
-            font=ctk.CTkFont(size=18, weight="bold"),
+            font=pooled_font(size=18, weight="bold"),
             text_color=("#FFFFFF", "#FFFFFF")
         )
         theme_title.pack(anchor="w", padx=20, pady=(15, 10))
@@ -373,7 +524,7 @@ class EnhancedHUDApp:
             btn = ctk.CTkButton(
                 theme_buttons_frame,
                 text=theme_name,
-                font=ctk.CTkFont(size=14, weight="bold"),
+                font=pooled_font(size=14, weight="bold"),
                 command=lambda t=theme_name: self.change_theme(t),
                 corner_radius=10,
                 height=38,
@@ -400,7 +551,7 @@ class EnhancedHUDApp:
         self.sync_button = ctk.CTkButton(
             sync_frame,
             text="Sync Settings",
-            font=ctk.CTkFont(size=18, weight="bold"),
+            font=pooled_font(size=18, weight="bold"),
             command=self.sync_settings,
             corner_radius=14,
             height=52,
@@ -408,25 +559,57 @@ class EnhancedHUDApp:
             hover_color=("#0051D5", "#0051D5"),
             text_color=("#FFFFFF", "#FFFFFF")
         )
-        self.sync_button.pack(fill="x", pady=(0, 12))
+        # Auto-sync replaces the manual button
+        if not self.auto_sync:
+            self.sync_button.pack(fill="x", pady=(0, 12))
         
         self.status_label = ctk.CTkLabel(
             sync_frame,
             text="Ready",
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=pooled_font(size=14, weight="bold"),
             text_color=("#8E8E93", "#8E8E93")
         )
         self.status_label.pack()
+        if self.sync_engine.error:
+            # Nothing to sync to until HUD_DEVICE is fixed
+            self.sync_button.configure(state="disabled")
+            self.status_label.configure(text=f"Sync off - {self.sync_engine.error}", wraplength=380)
         
     def on_feature_change(self, feature_name, is_on):
         """Handle feature state change"""
-        self.feature_states[feature_name] = is_on
+        changes, broken = RULES.toggle(self.feature_states, feature_name, is_on)
+        if broken:
+            # Rejected, the switch goes back to where it was
+            self.update_feature_switches([feature_name])
+            self.status_label.configure(text=f"{feature_name} not changed: {broken[0]}")
+            return
+        for title, on in changes.items():
+            self.feature_states[title] = on
+            self.dirty.mark(title)
+        self.update_feature_switches([title for title in changes if title != feature_name])
+        if self.auto_sync:
+            self.auto_sync.poke()
         status_text = "enabled" if is_on else "disabled"
-        self.status_label.configure(text=f"{feature_name} {status_text} (pending sync)")
+        self.status_label.configure(
+            text=f"{feature_name} {status_text}{side_effects(changes, feature_name)} "
+                 f"({self.dirty.pending} pending sync)")
+        
+    def update_feature_switches(self, titles):
+        """Move switches to match feature_states after a rule changed them"""
+        if not titles:
+            return
+        if self.settings_list is not None:
+            self.settings_list.refresh(set(titles))
+            return
+        for title in titles:
+            self.setting_items[title].bind_feature(title, self.feature_states[title])
         
     def change_theme(self, theme_name):
         """Change theme setting for target device"""
         self.current_theme = theme_name
+        self.dirty.mark_theme(theme_name)
+        if self.auto_sync:
+            self.auto_sync.poke()
         self.update_theme_buttons()
         self.status_label.configure(text=f"Theme set to {theme_name} for target device")
         
@@ -447,28 +630,70 @@ class EnhancedHUDApp:
         self.sync_button.configure(text="Syncing...", state="disabled")
         
         # Animate Dynamic Island
-        self.dynamic_island.toggle_island()
+        if not self.dynamic_island.is_expanded:
+            self.dynamic_island.toggle_island()
+        
+        self.sync_engine.sync(self.feature_states, self.current_theme, self.sync_complete,
+                              delta=self.dirty.delta(), progress=self.sync_progress)
         
-        self.root.update()
-        self.root.after(1500, self.sync_complete)
+    def sync_progress(self, stage):
+        """Show where the running sync is, on the status line and the island"""
+        self.status_label.configure(text=SYNC_STAGES[stage])
+        self.dynamic_island.set_message(SYNC_STAGES[stage])
         
-    def sync_complete(self):
+    def sync_complete(self, result):
         """Sync complete with enhanced feedback"""
         self.sync_button.configure(text="Sync Settings", state="normal")
+        if self.auto_sync:
+            self.auto_sync.done(result.ok)
+        if self.diagnostics_label:
+            self.diagnostics_label.configure(text=diagnostics_text(self.sync_engine.metrics))
         
         # Reset Dynamic Island
+        self.dynamic_island.set_message()
         if self.dynamic_island.is_expanded:
             self.dynamic_island.toggle_island()
         
+        if not result.ok:
+            self.status_label.configure(text=f"Sync failed - {result.error}")
+            return
+        self.dirty.acknowledge(result.payload)
+        self.persist_settings()
+        
         active_features = [name for name, status in self.feature_states.items() if status]
+        # Several devices report how many of them took the settings
+        synced = result.summary or "Synced to device"
         
         if active_features:
-            self.status_label.configure(text=f"Synced to device - {len(active_features)} features enabled")
+            self.status_label.configure(text=f"{synced} - {len(active_features)} features enabled")
         else:
-            self.status_label.configure(text="Synced to device - All features disabled")
+            self.status_label.configure(text=f"{synced} - All features disabled")
+            
+    def persist_settings(self):
+        """Save settings and the last synced snapshot"""
+        try:
+            save_settings(self.feature_states, self.current_theme,
+                          self.dirty.acked, self.dirty.acked_theme)
+        except OSError as e:
+            print(f"Could not save settings: {e}")
+            
+    def on_closing(self):
+        """Save settings, stop the sync worker and close the window"""
+        self.persist_settings()
+        if self.auto_sync:
+            self.auto_sync.cancel()
+        self.sync_engine.close()
+        if self.watchdog:
+            self.watchdog.stop()
+        self.root.destroy()
 
 def main():
     """Main function with enhanced rendering"""
+    # Opt-in startup profile, HUD_PROFILE=dir or --profile
+    profiler = profiler_from_env("enhanced_ui")
+    if profiler:
+        profiler.start(EnhancedHUDApp, "create_enhanced_interface")
+    
     root = ctk.CTk()
     
     # Enable high-quality rendering
@@ -486,6 +711,8 @@ def main():
     x = (root.winfo_screenwidth() // 2) - (width // 2)
     y = (root.winfo_screenheight() // 2) - (height // 2)
     root.geometry(f"{width}x{height}+{x}+{y}")
+    if profiler:
+        profiler.stop()
     
     root.mainloop()
 
@@ -0,0 +1,103 @@
+import io
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from hud_files import atomic_write
+
+# Rendered bitmaps, override with HUD_ASSET_CACHE
+ASSET_CACHE_DIR = Path(os.environ.get("HUD_ASSET_CACHE", Path.home() / ".hud_asset_cache"))
+
+# Bump when a renderer changes so stale files on disk are not reused
+ASSET_VERSION = 1
+
+MEMORY_ITEMS = 64  # bitmaps kept in memory, least recently used go first
+SUPERSAMPLE = 4  # shapes are drawn this much larger and downsampled for smooth edges
+
+
+def _rounded(size, radius, fill):
+    """Anti-aliased rounded rect, size and radius in device pixels"""
+    # Only needed on a cache miss, warm launches never import it
+    from PIL import ImageDraw
+
+    width, height = size
+    big = Image.new("RGBA", (width * SUPERSAMPLE, height * SUPERSAMPLE), 0)
+    ImageDraw.Draw(big).rounded_rectangle(
+        (0, 0, width * SUPERSAMPLE - 1, height * SUPERSAMPLE - 1),
+        radius=radius * SUPERSAMPLE, fill=fill
+    )
+    return big.resize(size, Image.LANCZOS)
+
+
+def render_island(size, radius, color, scale):
+    """Filled rounded rect for the Dynamic Island"""
+    return _rounded(size, radius, color)
+
+
+RENDERERS = {
+    "island": render_island,
+}
+
+
+class AssetCache:
+    """Rendered UI bitmaps, an in-memory LRU in front of a PNG directory
+
+    Assets are keyed by (kind, size, radius, color, scale). Size and radius
+    are logical pixels and are multiplied by scale before rendering, so a
+    DPI change gets new bitmaps while a relaunch reuses the files on disk.
+    """
+    def __init__(self, directory=ASSET_CACHE_DIR, max_items=MEMORY_ITEMS):
+        self.directory = Path(directory)
+        self.max_items = max_items
+        self.memory = OrderedDict()
+        self.stats = {"memory": 0, "disk": 0, "rendered": 0}
+
+    def path_for(self, key):
+        kind, (width, height), radius, color, scale = key
+        color = str(color).lstrip("#") or "none"
+        return self.directory / f"{kind}-{width}x{height}-r{radius}-{color}-s{scale:g}-v{ASSET_VERSION}.png"
+
+    def get(self, kind, size, radius, color=None, scale=1.0):
+        """PIL image for this asset, rendered at most once per key across launches"""
+        key = (kind, tuple(size), radius, color, scale)
+        image = self.memory.get(key)
+        if image is not None:
+            self.memory.move_to_end(key)
+            self.stats["memory"] += 1
+            return image
+
+        path = self.path_for(key)
+        try:
+            with Image.open(path) as f:
+                image = f.copy()
+            self.stats["disk"] += 1
+        except (OSError, ValueError):
+            device_size = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+            image = RENDERERS[kind](device_size, round(radius * scale), color, scale)
+            self.stats["rendered"] += 1
+            self._store(path, image)
+
+        self.memory[key] = image
+        if len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+        return image
+
+    def _store(self, path, image):
+        """Write the PNG atomically, a full disk only costs a re-render next time"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            png = io.BytesIO()
+            image.save(png, "PNG")
+            atomic_write(path, png.getvalue())
+        except OSError:
+            pass
+
+    def report(self):
+        """One-line summary of where assets came from"""
+        return ", ".join(f"{count} {source}" for source, count in self.stats.items())
+
+
+# Shared by every widget in the process
+ASSETS = AssetCache()
@@ -0,0 +1,88 @@
+"""
+Headless HUD settings tool for provisioning scripts
+
+Validates a settings file against the same feature list (HUD_CATALOG
+included) and themes the apps use, and syncs it to HUD_DEVICE (or
+--device) without the GUI. Only hud_codec, hud_store and hud_sync are
+loaded; tkinter and customtkinter never are, so a cold start stays well
+under 100 ms.
+
+    python hud_cli.py validate settings.json
+    python hud_cli.py apply settings.json [--device tcp://host:port] [--dry-run]
+
+The file is {"features": [...enabled titles] or {title: bool}, "theme": name},
+the shape hud_store saves. Exit status is 0 on success, 1 when the device
+did not ack and 2 for an invalid file.
+"""
+
+import argparse
+import json
+import sys
+
+from hud_store import SettingsError, load_catalog, validate_settings
+from hud_sync import DeviceLink, SyncError, transport_from_address
+
+EXIT_SYNC_FAILED = 1
+EXIT_INVALID = 2
+
+
+def read_settings(path):
+    """(feature_states, theme) from a settings file, SettingsError when it is not usable"""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except OSError as e:
+        raise SettingsError(f"cannot read {path} ({e.strerror})")
+    except ValueError as e:
+        raise SettingsError(f"{path} is not valid JSON ({e})")
+    return validate_settings(data, titles=load_catalog())
+
+
+def apply_settings(feature_states, theme, address=None):
+    """Push one full snapshot, returns the SyncResult"""
+    try:
+        link = DeviceLink(transport_from_address(address))
+    except ValueError as e:
+        raise SyncError(str(e))
+    try:
+        snapshot = {"full": True, "features": dict(feature_states), "theme": theme}
+        return link.push(snapshot)
+    finally:
+        link.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and sync HUD settings without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("validate", help="check a settings file").add_argument("settings")
+    apply_parser = commands.add_parser("apply", help="validate a settings file and sync it")
+    apply_parser.add_argument("settings")
+    apply_parser.add_argument("--device", help="device address or comma-separated list, default HUD_DEVICE")
+    apply_parser.add_argument("--dry-run", action="store_true", help="validate and print, do not sync")
+    args = parser.parse_args(argv)
+
+    try:
+        feature_states, theme = read_settings(args.settings)
+    except SettingsError as e:
+        print(f"invalid settings: {e}", file=sys.stderr)
+        return EXIT_INVALID
+    enabled = [title for title, on in feature_states.items() if on]
+    print(f"{args.settings}: theme {theme}, {len(enabled)} features on")
+    if args.command == "validate" or args.dry_run:
+        return 0
+
+    try:
+        result = apply_settings(feature_states, theme, args.device)
+    except SyncError as e:
+        print(f"sync failed: {e}", file=sys.stderr)
+        return EXIT_SYNC_FAILED
+    if not result.ok:
+        print(f"sync failed: {result.error}", file=sys.stderr)
+        return EXIT_SYNC_FAILED
+    print(f"{result.summary or 'Synced to device'} in {result.elapsed * 1000:.0f} ms"
+          + (f", {result.retries} retries" if result.retries else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
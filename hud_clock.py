@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+
+DEFAULT_FPS = 60
+
+
+def fps_from_env(setting=None):
+    """Frame rate from HUD_ANIMATION_FPS, DEFAULT_FPS when it is unset or malformed"""
+    if setting is None:
+        setting = os.environ.get("HUD_ANIMATION_FPS", "")
+    if not setting:
+        return DEFAULT_FPS
+    try:
+        fps = int(setting)
+    except ValueError:
+        fps = 0
+    # A bad value must not stop the app from starting, animations keep the default rate
+    if fps <= 0:
+        print(f"ignoring HUD_ANIMATION_FPS={setting!r}, expected a frame rate > 0", file=sys.stderr)
+        return DEFAULT_FPS
+    return fps
+
+
+# Frame rate of every animation in the app, override with HUD_ANIMATION_FPS
+ANIMATION_FPS = fps_from_env()
+
+
+class AnimationClock:
+    """One after() loop per root that drives every running animation
+
+    An animation is a callable taking the frame time (time.perf_counter())
+    and returning True while it wants more frames. All of them run in the
+    same tick, and the loop is only scheduled while at least one is
+    registered, so an idle app has no timers firing at all. Ticks that
+    arrive late are counted as dropped frames.
+    """
+    def __init__(self, root, fps=ANIMATION_FPS):
+        self.root = root
+        self.frame_ms = max(1, round(1000 / fps))
+        self.animations = []
+        self.job = None
+        self.ticking = False
+        self.last_tick = None
+        self.stats = {"ticks": 0, "dropped": 0, "max_ms": 0.0}
+
+    @property
+    def running(self):
+        return self.job is not None
+
+    def add(self, animation):
+        """Run animation(now) every frame until it returns False"""
+        if animation not in self.animations:
+            self.animations.append(animation)
+        # Added from inside a tick, the tick itself schedules the next one
+        if self.job is None and not self.ticking:
+            self.last_tick = time.perf_counter()
+            self.job = self.root.after(self.frame_ms, self._tick)
+
+    def remove(self, animation):
+        """Stop an animation early, the clock stops with the last one"""
+        if animation in self.animations:
+            self.animations.remove(animation)
+        if not self.animations:
+            self.stop()
+
+    def stop(self):
+        """Drop every animation and cancel the pending tick"""
+        self.animations.clear()
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        self.last_tick = None
+
+    def _tick(self):
+        self.job = None
+        now = time.perf_counter()
+        interval_ms = (now - self.last_tick) * 1000
+        self.stats["ticks"] += 1
+        self.stats["max_ms"] = max(self.stats["max_ms"], interval_ms)
+        # A tick one and a half frames late or more means frames were skipped
+        if interval_ms >= self.frame_ms * 1.5:
+            self.stats["dropped"] += round(interval_ms / self.frame_ms) - 1
+
+        self.ticking = True
+        try:
+            for animation in list(self.animations):
+                if not animation(now) and animation in self.animations:
+                    self.animations.remove(animation)
+        finally:
+            self.ticking = False
+
+        if self.animations:
+            self.last_tick = now
+            # Time spent in the animations comes out of the wait for the next frame
+            spent_ms = (time.perf_counter() - now) * 1000
+            self.job = self.root.after(max(1, round(self.frame_ms - spent_ms)), self._tick)
+        else:
+            self.last_tick = None
+
+    def report(self):
+        """One-line summary of the tick counters"""
+        return (f"clock: {self.stats['ticks']} ticks at {self.frame_ms} ms, "
+                f"{self.stats['dropped']} dropped, worst {self.stats['max_ms']:.1f} ms")
+
+
+def clock_for(root):
+    """The clock shared by everything under this root, created on first use"""
+    clock = getattr(root, "_hud_clock", None)
+    if clock is None:
+        clock = root._hud_clock = AnimationClock(root)
+    return clock
@@ -0,0 +1,192 @@
+"""
+Binary frame format for HUD settings
+
+This is not the transport format yet: hud_sync.DeviceLink still sends
+JSON lines, which carry the session id and catalog titles a frame has
+no room for. Frames are what hud_emulator devices accept over UDP and
+what bulk tools pack and unpack, via encode_frames()/decode_frames()
+for many at a time.
+
+A frame is 15 bytes, big-endian, so the Swift, Flutter and React Native
+clients can read it with plain byte access:
+
+    offset  size  field
+    0       1     schema version (SCHEMA_VERSION)
+    1       1     flags, bit 0 = full snapshot, otherwise a delta
+    2       4     sequence number
+    6       2     feature bitmask, bit i = FEATURE_TITLES[i] is on
+    8       2     changed bitmask, features carried by this frame
+    10      1     theme id, index into THEME_NAMES
+    11      4     CRC-32 of bytes 0-10
+
+Bit order and theme ids are part of the schema: append new features and
+themes at the end and bump SCHEMA_VERSION when the layout itself changes.
+"""
+
+import struct
+import zlib
+
+SCHEMA_VERSION = 1
+
+FEATURE_TITLES = (
+    "Rear Traffic Alert",
+    "Headlight Status",
+    "Turn Signals",
+    "Navigation",
+    "Speed Limits",
+    "Takeover Alerts",
+    "Lane Departure",
+    "Autopilot Status",
+    "Gear Position",
+    "Battery Range",
+    "Speed Display",
+)
+
+THEME_NAMES = ("Dark", "Light", "Nature", "Cyber")
+
+FEATURE_BITS = {title: 1 << i for i, title in enumerate(FEATURE_TITLES)}
+THEME_IDS = {name: i for i, name in enumerate(THEME_NAMES)}
+ALL_FEATURES = (1 << len(FEATURE_TITLES)) - 1
+
+FLAG_FULL = 0x01
+
+_HEADER = struct.Struct(">BBIHHB")
+_FRAME = struct.Struct(">BBIHHBI")
+FRAME_SIZE = _FRAME.size
+
+# numpy view of the same layout for the batch functions, built on first use
+_FRAME_DTYPE = None
+_CRC_TABLE = None
+
+
+class FrameError(ValueError):
+    """Raised for frames that are truncated, corrupted or from another schema"""
+
+
+def pack_features(feature_states):
+    """Fold a {title: bool} dict into a feature bitmask
+
+    Catalog titles outside FEATURE_TITLES have no bit and are left out.
+    """
+    mask = 0
+    for title, on in feature_states.items():
+        if on:
+            mask |= FEATURE_BITS.get(title, 0)
+    return mask
+
+
+def unpack_features(mask, changed=ALL_FEATURES):
+    """Expand a bitmask back into {title: bool}, limited to the changed bits"""
+    return {title: bool(mask & bit) for title, bit in FEATURE_BITS.items() if changed & bit}
+
+
+def encode_frame(seq, features, theme_id, changed=ALL_FEATURES, full=True):
+    """Encode already packed fields, this is the hot path"""
+    body = _HEADER.pack(SCHEMA_VERSION, FLAG_FULL if full else 0,
+                        seq & 0xFFFFFFFF, features, changed, theme_id)
+    return body + zlib.crc32(body).to_bytes(4, "big")
+
+
+def decode_frame(data):
+    """Decode and verify a frame into (seq, full, features, changed, theme_id)"""
+    if len(data) != FRAME_SIZE:
+        raise FrameError(f"expected {FRAME_SIZE} bytes, got {len(data)}")
+    version, flags, seq, features, changed, theme_id, crc = _FRAME.unpack(data)
+    if zlib.crc32(data[:_HEADER.size]) != crc:
+        raise FrameError("checksum mismatch")
+    if version != SCHEMA_VERSION:
+        raise FrameError(f"unsupported schema version {version}")
+    if theme_id >= len(THEME_NAMES):
+        raise FrameError(f"unknown theme id {theme_id}")
+    return seq, bool(flags & FLAG_FULL), features, changed, theme_id
+
+
+def encode_snapshot(feature_states, theme, seq, changed=None):
+    """Encode app settings, pass changed titles to mark the frame as a delta"""
+    if changed is None:
+        return encode_frame(seq, pack_features(feature_states), THEME_IDS[theme])
+    changed_mask = 0
+    for title in changed:
+        changed_mask |= FEATURE_BITS.get(title, 0)
+    return encode_frame(seq, pack_features(feature_states), THEME_IDS[theme],
+                        changed_mask, full=False)
+
+
+def decode_snapshot(data):
+    """Decode a frame back into the app's feature_states/theme shape"""
+    seq, full, features, changed, theme_id = decode_frame(data)
+    return {
+        "seq": seq,
+        "full": full,
+        "features": unpack_features(features, changed),
+        "theme": THEME_NAMES[theme_id],
+    }
+
+
+def _batch_tables():
+    """numpy dtype of a frame and the CRC-32 lookup table, built once"""
+    global _FRAME_DTYPE, _CRC_TABLE
+    if _FRAME_DTYPE is None:
+        import numpy as np
+        _FRAME_DTYPE = np.dtype([("version", "u1"), ("flags", "u1"), ("seq", ">u4"), ("features", ">u2"),
+                                 ("changed", ">u2"), ("theme_id", "u1"), ("crc", ">u4")])
+        table = np.arange(256, dtype=np.uint32)
+        for _ in range(8):
+            table = np.where(table & 1, (table >> 1) ^ np.uint32(0xEDB88320), table >> 1)
+        _CRC_TABLE = table.astype(np.uint32)
+    return _FRAME_DTYPE, _CRC_TABLE
+
+
+def _crc32_rows(headers):
+    """zlib.crc32 of every row of a (frames, 11) uint8 array, one byte column at a time"""
+    import numpy as np
+    _, table = _batch_tables()
+    crc = np.full(len(headers), 0xFFFFFFFF, dtype=np.uint32)
+    for column in headers.T:
+        crc = table[(crc ^ column) & 0xFF] ^ (crc >> 8)
+    return crc ^ np.uint32(0xFFFFFFFF)
+
+
+def encode_frames(seqs, features, theme_ids, changed=ALL_FEATURES, full=True):
+    """Encode many frames into one bytes object, FRAME_SIZE bytes per frame
+
+    Arguments are sequences or numpy arrays with one entry per frame,
+    changed may also be a single mask for all of them. Byte for byte the
+    same as calling encode_frame on each.
+    """
+    import numpy as np
+    dtype, _ = _batch_tables()
+    frames = np.empty(len(seqs), dtype=dtype)
+    frames["version"] = SCHEMA_VERSION
+    frames["flags"] = FLAG_FULL if full else 0
+    frames["seq"] = np.asarray(seqs, dtype=np.uint64) & 0xFFFFFFFF
+    frames["features"] = features
+    frames["changed"] = changed
+    frames["theme_id"] = theme_ids
+    raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    frames["crc"] = _crc32_rows(raw[:, :_HEADER.size])
+    return frames.tobytes()
+
+
+def decode_frames(data):
+    """Decode and verify concatenated frames into a numpy structured array
+
+    Fields are version, flags, seq, features, changed, theme_id and crc,
+    one row per frame. Any bad frame fails the whole batch with FrameError
+    naming its index, like decode_frame would for that frame alone.
+    """
+    import numpy as np
+    dtype, _ = _batch_tables()
+    if len(data) % FRAME_SIZE:
+        raise FrameError(f"expected a multiple of {FRAME_SIZE} bytes, got {len(data)}")
+    frames = np.frombuffer(data, dtype=dtype)
+    raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    checks = (
+        (_crc32_rows(raw[:, :_HEADER.size]) != frames["crc"], "checksum mismatch"),
+        (frames["version"] != SCHEMA_VERSION, "unsupported schema version"),
+        (frames["theme_id"] >= len(THEME_NAMES), "unknown theme id"),
+    )
+    for bad, message in checks:
+        if bad.any():
+            raise FrameError(f"frame {int(np.argmax(bad))}: {message}")
+    return frames
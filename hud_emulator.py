@@ -0,0 +1,268 @@
+"""
+Emulated HUD devices for load and latency testing
+
+Every device listens on its own port for TCP (JSON lines, as sent by
+hud_sync) and UDP (JSON or hud_codec frames), applies settings to an
+in-memory state and acks them. Link behavior is configurable per fleet:
+
+    latency    round-trip delay before the ack, ms
+    jitter     uniform +/- spread on the latency, ms
+    loss       probability a message is lost; UDP drops it (request or
+               ack), TCP pays a retransmit timeout instead
+    bandwidth  link speed in bytes/s, 0 for unlimited; messages queue
+               behind each other on a device's link
+
+All devices share one asyncio loop, so a single process can host
+thousands of them.
+
+    python hud_emulator.py --devices 500 --latency 20 --jitter 5 --loss 0.01
+    python hud_emulator.py --devices 8 --port 48000 --addresses devices.txt
+
+The printed (or written) address list can be used as HUD_DEVICE directly.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from hud_codec import FRAME_SIZE, FrameError, decode_snapshot
+
+RETRANSMIT_MS = 200  # what a lost TCP segment costs before it is resent
+
+
+class LinkProfile:
+    """Latency, jitter, loss and bandwidth of an emulated link"""
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0, bandwidth=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+
+    def delay(self):
+        """Round-trip delay for one message, in seconds"""
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def lost(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+
+class EmulatedDevice:
+    """One HUD unit: settings state, counters and its TCP/UDP endpoints"""
+    def __init__(self, profile):
+        self.profile = profile
+        self.features = {}
+        self.theme = None
+        self.boot = os.urandom(4).hex()
+        self.session = None
+        self.seq = None
+        self.port = None
+        self.link_free = 0.0
+        self.stats = {"applied": 0, "duplicates": 0, "rejected": 0, "lost": 0, "bytes": 0}
+        self.server = None
+        self.endpoint = None
+
+    async def start(self, port=0, host="127.0.0.1"):
+        """Listen on port (0 for any free one), UDP takes the same number"""
+        self.server = await asyncio.start_server(self._serve_tcp, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        loop = asyncio.get_running_loop()
+        self.endpoint, _ = await loop.create_datagram_endpoint(
+            lambda: _DeviceDatagrams(self), local_addr=(host, self.port))
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.endpoint is not None:
+            self.endpoint.close()
+
+    def apply(self, data):
+        """Apply a JSON message or hud_codec frame, returns the reply bytes
+
+        Messages at or below the last seq of the same session are acked but
+        not applied, so resends and reordered packets never redraw twice.
+        """
+        self.stats["bytes"] += len(data)
+        try:
+            if len(data) == FRAME_SIZE and not data.startswith(b"{"):
+                payload = decode_snapshot(data)
+            else:
+                payload = json.loads(data)
+        except (FrameError, ValueError) as e:
+            self.stats["rejected"] += 1
+            return json.dumps({"ok": False, "error": str(e)}).encode()
+        seq = payload.get("seq")
+        reply = {"ok": True, "boot": self.boot}
+        if seq is not None:
+            reply["seq"] = seq
+            if self.seq is not None and payload.get("session") == self.session and seq <= self.seq:
+                self.stats["duplicates"] += 1
+                reply["duplicate"] = True
+                return json.dumps(reply).encode()
+            self.session = payload.get("session")
+            self.seq = seq
+        if payload.get("full"):
+            self.features = {}
+        self.features.update(payload.get("features", {}))
+        self.theme = payload.get("theme", self.theme)
+        self.stats["applied"] += 1
+        return json.dumps(reply).encode()
+
+    async def link_delay(self, size, reliable):
+        """Wait out latency, bandwidth and loss, False if the message is gone"""
+        delay = self.profile.delay()
+        if self.profile.bandwidth:
+            # Messages on one device's link go out one after another
+            now = time.monotonic()
+            self.link_free = max(now, self.link_free) + size / self.profile.bandwidth
+            delay += self.link_free - now
+        if self.profile.lost():
+            self.stats["lost"] += 1
+            if not reliable:
+                return False
+            delay += RETRANSMIT_MS / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+
+    async def _serve_tcp(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self.link_delay(len(line), reliable=True)
+                writer.write(self.apply(line.rstrip(b"\n")) + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer_datagram(self, data, addr):
+        if await self.link_delay(len(data), reliable=False):
+            reply = self.apply(data)
+            # The ack crosses the same lossy link on the way back
+            if self.profile.lost():
+                self.stats["lost"] += 1
+            else:
+                self.endpoint.sendto(reply, addr)
+
+
+class _DeviceDatagrams(asyncio.DatagramProtocol):
+    def __init__(self, device):
+        self.device = device
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self.device.answer_datagram(data, addr))
+
+
+class Fleet:
+    """A set of emulated devices on one loop"""
+    def __init__(self, devices):
+        self.devices = devices
+
+    def addresses(self, scheme="tcp"):
+        """HUD_DEVICE value that targets every device in the fleet"""
+        return ",".join(f"{scheme}://127.0.0.1:{device.port}" for device in self.devices)
+
+    def stats(self):
+        """Counters summed over the fleet"""
+        totals = {"devices": len(self.devices)}
+        for device in self.devices:
+            for key, value in device.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def close(self):
+        for device in self.devices:
+            device.close()
+
+
+def _raise_fd_limit(needed):
+    """Every device holds two sockets, lift the soft limit where the OS allows it"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+async def start_fleet(count, base_port=0, latency_ms=0.0, jitter_ms=0.0, loss=0.0, bandwidth=0, seed=None):
+    """Start count devices; with base_port they take consecutive ports from it"""
+    _raise_fd_limit(count * 2 + 256)
+    profile_random = random.Random(seed)
+    devices = []
+    for i in range(count):
+        profile = LinkProfile(latency_ms, jitter_ms, loss, bandwidth, profile_random.random())
+        port = base_port + i if base_port else 0
+        devices.append(await EmulatedDevice(profile).start(port))
+    return Fleet(devices)
+
+
+def start_fleet_thread(count, **options):
+    """Run a fleet on a daemon thread, for benchmarks driving a sync client
+
+    Returns (fleet, stop), stop() shuts the devices and the loop down.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="hud-emulator", daemon=True).start()
+    fleet = asyncio.run_coroutine_threadsafe(start_fleet(count, **options), loop).result()
+
+    def stop():
+        loop.call_soon_threadsafe(fleet.close)
+        loop.call_soon_threadsafe(loop.stop)
+
+    return fleet, stop
+
+
+async def _run(args):
+    fleet = await start_fleet(args.devices, args.port, args.latency, args.jitter,
+                              args.loss, args.bandwidth, args.seed)
+    addresses = fleet.addresses(args.scheme)
+    if args.addresses:
+        with open(args.addresses, "w", encoding="utf-8") as f:
+            f.write(addresses + "\n")
+        print(f"{args.devices} devices up, addresses written to {args.addresses}")
+    else:
+        print(addresses)
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            print(" ".join(f"{key}={value}" for key, value in fleet.stats().items()), file=sys.stderr)
+    finally:
+        fleet.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulated HUD devices for sync load testing")
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0, help="first port, 0 for any free ones")
+    parser.add_argument("--latency", type=float, default=0.0, help="round-trip ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="0-1")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes/s, 0 for unlimited")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--scheme", choices=("tcp", "udp"), default="tcp")
+    parser.add_argument("--addresses", help="write the HUD_DEVICE list here instead of stdout")
+    parser.add_argument("--report", type=float, default=10.0, help="seconds between stats lines")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+
+from hud_sync import DEVICE_TIMEOUT, FANOUT_LIMIT, SyncError, SyncResult, acked_seq, parse_address
+
+
+class _DatagramReply(asyncio.DatagramProtocol):
+    def __init__(self, seq=None):
+        self.seq = seq
+        self.reply = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        if not self.reply.done() and (self.seq is None or acked_seq(data) in (None, self.seq)):
+            self.reply.set_result(data)
+
+    def error_received(self, exc):
+        if not self.reply.done():
+            self.reply.set_exception(exc)
+
+
+async def _exchange_async(address, data, timeout, seq=None, retries=6):
+    """One request/reply with a device over a fresh asyncio connection
+
+    Returns (reply, resends). Over UDP the message is resent with
+    exponential backoff until it is acked or the timeout runs out.
+    """
+    scheme, host, port = parse_address(address)
+    if scheme == "tcp":
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(data + b"\n")
+            await writer.drain()
+            reply = await reader.readline()
+        finally:
+            writer.close()
+        if not reply:
+            raise SyncError(f"device {host}:{port} closed the connection")
+        return reply.rstrip(b"\n"), 0
+
+    transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: _DatagramReply(seq), remote_addr=(host, port))
+    try:
+        # Backoff doubles from a slice of the budget, so every attempt fits inside it
+        wait = timeout / (2 ** retries - 1)
+        for attempt in range(retries):
+            transport.sendto(data)
+            done, _ = await asyncio.wait({protocol.reply}, timeout=wait * 2 ** attempt)
+            if done:
+                return protocol.reply.result(), attempt
+        raise asyncio.TimeoutError
+    finally:
+        transport.close()
+
+
+async def sync_device(address, data, limit, timeout, seq):
+    """Push data to one device while holding the limit semaphore, returns a SyncResult"""
+    async with limit:
+        start = time.perf_counter()
+        try:
+            reply, resends = await asyncio.wait_for(_exchange_async(address, data, timeout, seq), timeout)
+            reply = json.loads(reply)
+            if not reply.get("ok"):
+                raise SyncError(reply.get("error", "device rejected settings"))
+        except asyncio.TimeoutError:
+            return SyncResult(False, error="timed out", elapsed=time.perf_counter() - start, size=len(data))
+        except (SyncError, OSError, ValueError) as e:
+            return SyncResult(False, error=str(e), elapsed=time.perf_counter() - start, size=len(data))
+        return SyncResult(True, elapsed=time.perf_counter() - start, retries=resends, size=len(data))
+
+
+async def fan_out(addresses, data, limit=FANOUT_LIMIT, timeout=DEVICE_TIMEOUT, seq=None):
+    """Send data to every device concurrently, returns {address: SyncResult}
+
+    At most limit devices are in flight at once and each gets timeout
+    seconds, so one dead unit costs at most its own timeout.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    results = await asyncio.gather(*[sync_device(address, data, semaphore, timeout, seq)
+                                     for address in addresses])
+    return dict(zip(addresses, results))
+
+
+def summarize(results):
+    """'7/8 devices synced, 1 timed out' for a fan_out result"""
+    synced = sum(1 for result in results.values() if result.ok)
+    timed_out = sum(1 for result in results.values() if result.error == "timed out")
+    failed = len(results) - synced - timed_out
+    summary = f"{synced}/{len(results)} devices synced"
+    if timed_out:
+        summary += f", {timed_out} timed out"
+    if failed:
+        summary += f", {failed} failed"
+    return summary
+
+
+class FanoutTransport:
+    """Several HUD devices behind the single-device transport interface
+
+    Each exchange pushes the message to every device concurrently on a
+    private asyncio loop and answers with one aggregated reply, ok only when
+    every device acked. Devices may have missed earlier syncs, so connect()
+    always reports a new link and every sync is a full snapshot.
+    """
+    def __init__(self, addresses, limit=FANOUT_LIMIT, timeout=DEVICE_TIMEOUT):
+        self.addresses = [address.strip() for address in addresses]
+        for address in self.addresses:
+            parse_address(address)  # a malformed entry fails here, not on every sync
+        self.address = f"fanout:{len(self.addresses)}"
+        self.limit = limit
+        self.timeout = timeout
+        self.loop = None
+        self.results = {}
+        self.last_retries = 0
+
+    def connect(self):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        return True
+
+    def exchange(self, data, seq=None):
+        self.results = self.loop.run_until_complete(
+            fan_out(self.addresses, data, self.limit, self.timeout, seq))
+        self.last_retries = sum(result.retries for result in self.results.values())
+        summary = summarize(self.results)
+        ok = all(result.ok for result in self.results.values())
+        return json.dumps({"ok": ok, "error": summary, "summary": summary}).encode()
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.close()
+        self.loop = None
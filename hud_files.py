@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+
+
+def atomic_write(path, data):
+    """Write str or bytes to path so readers see the old file or the new one, never half
+
+    The data goes to a uniquely named temp file next to path, is flushed to
+    disk and then renamed over it, so processes writing the same file at
+    once never share a temp file. OSError is left to the caller, who knows
+    whether a failed write matters; the temp file is cleaned up either way.
+    """
+    # Only needed once something is written, hud_cli never pays for it
+    import tempfile
+
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from hud_files import atomic_write
+
+# Resolved font cache, override with HUD_FONT_CACHE
+FONT_CACHE_PATH = Path(os.environ.get("HUD_FONT_CACHE", Path.home() / ".hud_font_cache.json"))
+
+# Modern rounded system fonts, Windows 11's variable font first
+PREFERRED_FONTS = {
+    "regular": "Segoe UI Variable",
+    "bold": "Segoe UI Variable",
+    "medium": "Segoe UI Variable"
+}
+
+# Fallback to regular Segoe UI if variable version not available
+FALLBACK_FONTS = {
+    "regular": "Segoe UI",
+    "bold": "Segoe UI",
+    "medium": "Segoe UI"
+}
+
+# Shared by every widget, filled in place by load_custom_fonts once a root exists
+CUSTOM_FONTS = dict(FALLBACK_FONTS)
+
+_resolved = False
+
+
+def _font_dirs():
+    """Directories whose contents decide which families Tk can see"""
+    home = Path.home()
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        local = os.environ.get("LOCALAPPDATA", str(home / "AppData" / "Local"))
+        return [Path(windir) / "Fonts", Path(local) / "Microsoft" / "Windows" / "Fonts"]
+    if sys.platform == "darwin":
+        return [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"]
+    return [Path("/usr/share/fonts"), Path("/usr/local/share/fonts"), home / ".fonts",
+            home / ".local" / "share" / "fonts", Path("/var/cache/fontconfig")]
+
+
+def font_set_key():
+    """Cheap fingerprint of the installed font set, no enumeration needed
+
+    Installing or removing a font touches its directory, so the directory
+    mtimes change whenever the result of tkFont.families() could.
+    """
+    parts = [sys.platform, json.dumps(PREFERRED_FONTS, sort_keys=True)]
+    for directory in _font_dirs():
+        try:
+            parts.append(f"{directory}:{os.stat(directory).st_mtime_ns}")
+        except OSError:
+            continue
+    return "|".join(parts)
+
+
+def _resolve(root):
+    import tkinter.font as tkFont
+
+    available_fonts = set(tkFont.families(root))
+    return {weight: family if family in available_fonts else FALLBACK_FONTS[weight]
+            for weight, family in PREFERRED_FONTS.items()}
+
+
+def load_custom_fonts(root, cache_path=FONT_CACHE_PATH):
+    """Resolve CUSTOM_FONTS for this machine, reusing the on-disk cache when valid
+
+    Needs a Tk root, enumerating families before one exists makes Tk create
+    a hidden default root. Only the first call per process does any work.
+    """
+    global _resolved
+    if _resolved:
+        return CUSTOM_FONTS
+
+    key = font_set_key()
+    fonts = None
+    try:
+        with open(cache_path, "rb") as f:
+            cached = json.loads(f.read())
+        if cached.get("key") == key and set(cached.get("fonts", ())) == set(PREFERRED_FONTS):
+            fonts = cached["fonts"]
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if fonts is None:
+        try:
+            fonts = _resolve(root)
+        except Exception:
+            fonts = dict(FALLBACK_FONTS)
+        else:
+            try:
+                atomic_write(cache_path, json.dumps({"key": key, "fonts": fonts}))
+            except OSError:
+                pass
+
+    CUSTOM_FONTS.update(fonts)
+    _resolved = True
+    return CUSTOM_FONTS
+
+
+# Process-wide CTkFont pool keyed by (family, size, weight)
+_font_pool = {}
+_font_pool_root = None
+FONT_POOL_STATS = {"created": 0, "reused": 0}
+
+
+def pooled_font(family=None, size=None, weight=None):
+    """Shared CTkFont for this family/size/weight, drop-in for ctk.CTkFont(...)
+
+    Every widget with the same triple gets the same font object, so Tk keeps
+    one named font and scaling changes re-resolve it once. Fonts belong to
+    the default root, the pool starts over when that root is replaced.
+    """
+    global _font_pool_root
+    import tkinter
+    import customtkinter as ctk
+
+    root = tkinter._default_root
+    if root is not _font_pool_root:
+        _font_pool.clear()
+        _font_pool_root = root
+
+    key = (family, size, weight)
+    font = _font_pool.get(key)
+    if font is None:
+        font = _font_pool[key] = ctk.CTkFont(family=family, size=size, weight=weight)
+        FONT_POOL_STATS["created"] += 1
+    else:
+        FONT_POOL_STATS["reused"] += 1
+    return font
+
+
+def font_pool_report():
+    """One-line summary of the pool counters"""
+    created = FONT_POOL_STATS["created"]
+    reused = FONT_POOL_STATS["reused"]
+    return f"fonts: {created} created, {reused} reused ({reused / max(1, created + reused):.0%} hit rate)"
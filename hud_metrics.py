@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+
+from hud_files import atomic_write
+
+# Export file for monitoring, .json for JSON, anything else gets Prometheus text
+METRICS_FILE = os.environ.get("HUD_METRICS_FILE", "")
+
+# Diagnostics row under the status card, off unless HUD_DIAGNOSTICS=1
+DIAGNOSTICS = os.environ.get("HUD_DIAGNOSTICS", "") not in ("", "0")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 4096, 16384)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the shape Prometheus expects"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating inside the one that holds q"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Named counters and histograms, one series per label set
+
+    Written from the Tk thread as syncs complete; the lock only guards
+    against an export or report running on another thread meanwhile.
+    """
+    def __init__(self):
+        self.metrics = {}  # name -> (kind, help, {labels: metric})
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text, **labels):
+        return self._series(name, "counter", help_text, Counter, labels)
+
+    def histogram(self, name, help_text, buckets, **labels):
+        return self._series(name, "histogram", help_text, lambda: Histogram(buckets), labels)
+
+    def _series(self, name, kind, help_text, factory, labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            _, _, series = self.metrics.setdefault(name, (kind, help_text, {}))
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = factory()
+            return metric
+
+    def total(self, name):
+        """Counter summed over every label set"""
+        with self.lock:
+            _, _, series = self.metrics.get(name, (None, None, {}))
+            return sum(metric.value for metric in series.values())
+
+    def merged(self, name, buckets):
+        """Histogram combining every label set"""
+        combined = Histogram(buckets)
+        with self.lock:
+            _, _, series = self.metrics.get(name, (None, None, {}))
+            for metric in series.values():
+                combined.merge(metric)
+        return combined
+
+    def to_json(self):
+        out = {}
+        with self.lock:
+            for name, (kind, help_text, series) in self.metrics.items():
+                entries = []
+                for key, metric in series.items():
+                    entry = {"labels": dict(key)}
+                    if kind == "counter":
+                        entry["value"] = metric.value
+                    else:
+                        entry.update(buckets=list(metric.buckets), counts=metric.counts,
+                                     sum=metric.sum, count=metric.count)
+                    entries.append(entry)
+                out[name] = {"type": kind, "help": help_text, "series": entries}
+        return json.dumps(out, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, (kind, help_text, series) in self.metrics.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, metric in series.items():
+                    labels = ",".join(f'{label}="{value}"' for label, value in key)
+                    if kind == "counter":
+                        lines.append(f"{name}{{{labels}}} {metric.value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(metric.buckets) + ["+Inf"], metric.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {metric.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Write the export file atomically, scrapers never see half a file"""
+        path = path or METRICS_FILE
+        if not path:
+            return
+        text = self.to_json() if str(path).endswith(".json") else self.to_prometheus()
+        try:
+            atomic_write(path, text)
+        except OSError:
+            pass
+
+
+def record_sync(registry, device, result):
+    """Fold one device's SyncResult into the sync metrics"""
+    registry.counter("hud_syncs_total", "Syncs attempted", device=device).inc()
+    registry.histogram("hud_sync_latency_seconds", "Sync round-trip time",
+                       LATENCY_BUCKETS, device=device).observe(result.elapsed)
+    registry.histogram("hud_sync_payload_bytes", "Bytes sent per sync",
+                       SIZE_BUCKETS, device=device).observe(result.bytes)
+    registry.counter("hud_sync_retries_total", "Messages resent", device=device).inc(result.retries)
+    if not result.ok:
+        registry.counter("hud_sync_failures_total", "Syncs that did not get acked", device=device).inc()
+
+
+def diagnostics_text(registry):
+    """One line for the diagnostics row"""
+    syncs = registry.total("hud_syncs_total")
+    if not syncs:
+        return "No syncs yet"
+    latency = registry.merged("hud_sync_latency_seconds", LATENCY_BUCKETS)
+    size = registry.merged("hud_sync_payload_bytes", SIZE_BUCKETS)
+    return (f"{syncs} syncs · p50 {latency.quantile(0.5) * 1000:.0f} ms · "
+            f"p95 {latency.quantile(0.95) * 1000:.0f} ms · "
+            f"{size.sum / size.count:.0f} B avg · "
+            f"{registry.total('hud_sync_retries_total')} retries · "
+            f"{registry.total('hud_sync_failures_total')} failed")
+
+
+# Shared by every sync engine in the process
+METRICS = MetricsRegistry()
@@ -0,0 +1,185 @@
+"""
+Fleet diff planner over packed feature bitmasks
+
+Fleet state is two arrays, one row per vehicle: the hud_codec feature
+bitmask (bit i = FEATURE_TITLES[i]) and the theme id. Against a target
+profile the planner finds, without a Python loop per vehicle, which
+vehicles differ, which features flip on each, how many change, and
+groups vehicles that need the identical delta into update batches.
+
+    python hud_plan.py fleet.npz target.json [--top 10]
+
+fleet.npz holds "masks" (uint16), "themes" (uint8) and optionally
+"vehicles"; a .jsonl or .csv export in the hud_provision shape is read
+too, and --save writes it back as .npz for the next run.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from hud_codec import FEATURE_BITS, FEATURE_TITLES, THEME_IDS, pack_features
+from hud_rules import RULES
+from hud_store import SettingsError, validate_settings
+
+# Changed-feature count for every possible mask, indexed by the XOR diff
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(1 << len(FEATURE_TITLES))], dtype=np.uint8)
+
+# Batch key bit for "theme changes too", just above the feature bits so keys
+# stay 16-bit and numpy's stable argsort can radix sort them
+THEME_FLAG = 1 << len(FEATURE_TITLES)
+
+
+class FleetState:
+    """Packed settings of a fleet, one array row per vehicle"""
+    def __init__(self, masks, themes, vehicles=None):
+        self.masks = np.asarray(masks, dtype=np.uint16)
+        self.themes = np.asarray(themes, dtype=np.uint8)
+        self.vehicles = vehicles
+        if self.masks.shape != self.themes.shape:
+            raise ValueError("masks and themes must have one entry per vehicle")
+
+    def __len__(self):
+        return len(self.masks)
+
+    def save(self, path):
+        arrays = {"masks": self.masks, "themes": self.themes}
+        if self.vehicles is not None:
+            arrays["vehicles"] = np.asarray(self.vehicles)
+        np.savez(path, **arrays)
+
+
+def load_fleet(path):
+    """FleetState from an .npz or a hud_provision style .jsonl/.csv export"""
+    if str(path).endswith(".npz"):
+        with np.load(path) as data:
+            vehicles = data["vehicles"] if "vehicles" in data else None
+            return FleetState(data["masks"], data["themes"], vehicles)
+
+    # Exports are parsed row by row, save them as .npz to skip this next time
+    from hud_provision import read_rows
+    masks, themes, vehicles = [], [], []
+    for line, row in read_rows(path):
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            # Vehicles are loaded as they are, rule_violations() counts the invalid ones
+            feature_states, theme = validate_settings(row, check_rules=False)
+        except ValueError as e:
+            raise SettingsError(f"{path} line {line}: {e}")
+        masks.append(pack_features(feature_states))
+        themes.append(THEME_IDS[theme])
+        vehicles.append(str(row.get("vehicle") or ""))
+    return FleetState(masks, themes, vehicles)
+
+
+class Batch:
+    """Vehicles that need the same delta to reach the target"""
+    def __init__(self, changed, theme, target_mask, vehicles):
+        self.changed = changed  # bitmask of features that flip
+        self.theme = theme  # target theme name, None when it already matches
+        self.target_mask = target_mask
+        self.vehicles = vehicles  # row indices into the FleetState
+
+    def delta(self):
+        """The message to send, in DirtyTracker's delta shape"""
+        payload = {"features": {title: bool(self.target_mask & bit)
+                                for title, bit in FEATURE_BITS.items() if self.changed & bit}}
+        if self.theme is not None:
+            payload["theme"] = self.theme
+        return payload
+
+
+class FleetPlan:
+    """Per-vehicle diffs of a fleet against one target profile
+
+    diff is the XOR of each vehicle's mask with the target, so bit i is
+    set exactly where FEATURE_TITLES[i] has to flip. Everything below is
+    derived from it with whole-array operations.
+    """
+    def __init__(self, fleet, target_states, target_theme):
+        self.fleet = fleet
+        self.target_mask = pack_features(target_states)
+        self.target_theme = target_theme
+        self.diff = fleet.masks ^ np.uint16(self.target_mask)
+        self.changes = POPCOUNT[self.diff]
+        self.theme_changed = fleet.themes != THEME_IDS[target_theme]
+        self.needs_update = (self.diff != 0) | self.theme_changed
+
+    @property
+    def outdated(self):
+        return int(np.count_nonzero(self.needs_update))
+
+    def rule_violations(self):
+        """Vehicles whose current settings break hud_rules.RULES"""
+        return int(np.count_nonzero(~RULES.valid_masks(self.fleet.masks)))
+
+    def feature_changes(self):
+        """{title: (vehicles turning it on, vehicles turning it off)}"""
+        turning_on = self.diff & np.uint16(self.target_mask)
+        counts = {}
+        for title, bit in FEATURE_BITS.items():
+            on = int(np.count_nonzero(turning_on & bit))
+            counts[title] = (on, int(np.count_nonzero(self.diff & bit)) - on)
+        return counts
+
+    def change_histogram(self):
+        """Vehicles by number of features that change, index = count"""
+        return np.bincount(self.changes, minlength=len(FEATURE_TITLES) + 1)
+
+    def batches(self):
+        """Update batches, largest first, one per distinct (diff, theme change)"""
+        rows = np.flatnonzero(self.needs_update)
+        keys = self.diff[rows] | (self.theme_changed[rows].astype(np.uint16) * np.uint16(THEME_FLAG))
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        groups = np.split(rows[order], starts[1:])
+        batches = [Batch(int(keys[start]) & ~THEME_FLAG,
+                         self.target_theme if keys[start] & THEME_FLAG else None,
+                         self.target_mask, vehicles)
+                   for start, vehicles in zip(starts, groups)]
+        batches.sort(key=lambda batch: -len(batch.vehicles))
+        return batches
+
+
+def main(argv=None):
+    from hud_cli import EXIT_INVALID, read_settings
+
+    parser = argparse.ArgumentParser(description="Plan a fleet push: which vehicles and features change")
+    parser.add_argument("fleet", help=".npz fleet state, or a .jsonl/.csv export")
+    parser.add_argument("target", help="settings file with the target profile")
+    parser.add_argument("--top", type=int, default=10, help="batches to list")
+    parser.add_argument("--save", help="write the fleet state as .npz")
+    args = parser.parse_args(argv)
+
+    try:
+        target_states, target_theme = read_settings(args.target)
+        fleet = load_fleet(args.fleet)
+    except (SettingsError, OSError) as e:
+        print(f"cannot plan: {e}", file=sys.stderr)
+        return EXIT_INVALID
+    if args.save:
+        fleet.save(args.save)
+
+    plan = FleetPlan(fleet, target_states, target_theme)
+    batches = plan.batches()
+    print(f"{plan.outdated:,} of {len(fleet):,} vehicles differ from the target, "
+          f"{int(plan.theme_changed.sum()):,} change theme, {len(batches):,} distinct deltas")
+    invalid = plan.rule_violations()
+    if invalid:
+        print(f"{invalid:,} vehicles currently break feature rules")
+    print("features changed per vehicle: "
+          + ", ".join(f"{count}: {vehicles:,}" for count, vehicles in enumerate(plan.change_histogram()) if vehicles))
+    for title, (on, off) in plan.feature_changes().items():
+        if on or off:
+            print(f"  {title:<20} {on:>10,} on {off:>10,} off")
+    for batch in batches[:args.top]:
+        print(f"  {len(batch.vehicles):>10,} vehicles  {batch.delta()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
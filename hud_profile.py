@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+# Startup profiling, off unless HUD_PROFILE is set (to an output directory, or 1 for
+# the working directory) or the app is started with --profile. cProfile,
+# pstats and tracemalloc are only imported then, every other launch skips them
+PROFILE = os.environ.get("HUD_PROFILE", "")
+
+TOP = 30  # rows in each report section
+TRACE_FRAMES = 10  # traceback depth kept per allocation
+
+
+class StartupProfiler:
+    """cProfile plus tracemalloc around app construction and the first idle pass
+
+    start(app_class, "create_interface") also times the class's __init__ and
+    the named methods as phases, with the memory they allocated. stop()
+    ends the first idle phase and writes a text report (phases, hot
+    functions by cumulative and own time, top allocations) next to a .prof
+    file that snakeviz or pstats can open.
+    """
+    def __init__(self, name, out_dir="."):
+        import cProfile
+        self.name = name
+        self.out_dir = Path(out_dir)
+        self.profile = cProfile.Profile()
+        self.phases = []  # (label, ms, allocated bytes)
+        self.patched = []
+        self.constructed = None
+
+    def start(self, app_class, *method_names):
+        import tracemalloc
+        tracemalloc.start(TRACE_FRAMES)
+        for method_name in ("__init__",) + method_names:
+            self._time_method(app_class, method_name)
+        self.profile.enable()
+
+    def _time_method(self, cls, method_name):
+        import tracemalloc
+        original = cls.__dict__[method_name]
+        label = f"{cls.__name__}.{method_name}"
+        profiler = self
+
+        def timed(*args, **kwargs):
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                profiler.phases.append((label, elapsed_ms, tracemalloc.get_traced_memory()[0] - before))
+                if method_name == "__init__":
+                    profiler.constructed = (time.perf_counter(), tracemalloc.get_traced_memory()[0])
+
+        setattr(cls, method_name, timed)
+        self.patched.append((cls, method_name, original))
+
+    def stop(self):
+        """End profiling, write the report and return its path"""
+        import tracemalloc
+        self.profile.disable()
+        if self.constructed is not None:
+            constructed_at, memory = self.constructed
+            self.phases.append(("first idle", (time.perf_counter() - constructed_at) * 1000,
+                                tracemalloc.get_traced_memory()[0] - memory))
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        for cls, method_name, original in self.patched:
+            setattr(cls, method_name, original)
+        self.patched = []
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        report_path = self.out_dir / f"hud_profile_{self.name}_{stamp}.txt"
+        self.profile.dump_stats(report_path.with_suffix(".prof"))
+        report_path.write_text(self.report(snapshot), encoding="utf-8")
+        print(f"startup profile written to {report_path}", file=sys.stderr)
+        return report_path
+
+    def report(self, snapshot):
+        import io
+        import pstats
+        out = io.StringIO()
+        out.write(f"HUD startup profile: {self.name}, {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        out.write("phases\n")
+        for label, elapsed_ms, allocated in self.phases:
+            out.write(f"  {label:<32} {elapsed_ms:9.1f} ms  {allocated / 1024:+10.1f} KiB\n")
+
+        for title, key in (("hot functions by cumulative time", "cumulative"),
+                           ("hot functions by own time", "tottime")):
+            out.write(f"\n{title}\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.strip_dirs().sort_stats(key).print_stats(TOP)
+
+        out.write("top allocations still held\n")
+        for stat in snapshot.statistics("lineno")[:TOP]:
+            frame = stat.traceback[0]
+            out.write(f"  {stat.size / 1024:9.1f} KiB {stat.count:7d} blocks  {frame.filename}:{frame.lineno}\n")
+        return out.getvalue()
+
+
+def profiler_from_env(name, setting=PROFILE, argv=None):
+    """StartupProfiler when HUD_PROFILE or --profile asks for one, else None"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not setting and "--profile" not in argv:
+        return None
+    out_dir = setting if setting and setting != "1" else "."
+    return StartupProfiler(name, out_dir)
@@ -0,0 +1,239 @@
+"""
+Streaming bulk provisioning from fleet exports
+
+Each row of a JSONL or CSV export is one vehicle: its HUD device address
+and the settings to give it, in the same features/theme shape hud_cli
+takes.
+
+    {"vehicle": "VIN123", "device": "tcp://10.0.4.17:47800", "features": ["Navigation"], "theme": "Dark"}
+
+    vehicle,device,theme,features
+    VIN123,tcp://10.0.4.17:47800,Dark,Navigation;Speed Display
+
+Rows are read lazily in chunks, validated and encoded in a process pool,
+and pushed by a fixed number of async connections. Every stage has a
+bounded backlog, so memory stays flat however long the file is.
+
+    python hud_provision.py fleet.jsonl [--workers N] [--limit N] [--failures failed.jsonl]
+
+Rows that were invalid or did not get acked go to --failures as JSONL
+with their line number and error. Exit status follows hud_cli: 2 when
+some rows were invalid, 1 when some devices failed, 0 otherwise.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+from hud_cli import EXIT_INVALID, EXIT_SYNC_FAILED
+from hud_fanout import sync_device
+from hud_store import SettingsError, validate_settings
+from hud_sync import DEVICE_TIMEOUT, FANOUT_LIMIT, parse_address
+
+CHUNK_ROWS = 512  # rows per process pool task
+REPORT_SECONDS = 2.0
+
+
+def read_rows(path):
+    """(line number, row) pairs from a .jsonl or .csv export, one at a time
+
+    JSONL rows are handed on as raw lines, so parsing happens in the pool
+    along with the rest of the validation.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if str(path).endswith(".csv"):
+            reader = csv.DictReader(f)
+            for row in reader:
+                row["features"] = [title.strip() for title in (row.get("features") or "").split(";")
+                                   if title.strip()]
+                if not row.get("theme"):
+                    row.pop("theme", None)
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+
+
+def chunked(rows, size=CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_chunk(session, chunk):
+    """Validate and encode rows in a pool worker
+
+    Returns (line, vehicle, device, message, error) tuples: a ready to send
+    full snapshot for valid rows, the reason for invalid ones.
+    """
+    encoded = []
+    for line, row in chunk:
+        vehicle = device = None
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            if not isinstance(row, dict):
+                raise SettingsError("row must be a JSON object")
+            vehicle = row.get("vehicle")
+            device = row.get("device")
+            if not device:
+                raise SettingsError("no device address")
+            parse_address(device)
+            features, theme = validate_settings(row)
+        except ValueError as e:
+            encoded.append((line, vehicle, device, None, str(e)))
+            continue
+        # Every device gets seq 1 of this run's session, a rerun is a new session
+        message = {"full": True, "features": features, "theme": theme, "session": session, "seq": 1}
+        encoded.append((line, vehicle, device, json.dumps(message).encode(), None))
+    return encoded
+
+
+class Provisioner:
+    """Reader, process pool and connection pool joined by bounded queues"""
+    def __init__(self, workers=None, limit=FANOUT_LIMIT, timeout=DEVICE_TIMEOUT,
+                 failures=None, dry_run=False, out=sys.stderr):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.limit = limit
+        self.timeout = timeout
+        self.failures = failures
+        self.dry_run = dry_run
+        self.out = out
+        self.session = os.urandom(4).hex()
+        self.stats = {"read": 0, "invalid": 0, "synced": 0, "failed": 0}
+        self.start = None
+
+    def run(self, rows):
+        """Provision every row, returns the stats"""
+        asyncio.run(self._run(rows))
+        self.report(final=True)
+        return self.stats
+
+    async def _run(self, rows):
+        self.start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.limit * 2)
+        connections = asyncio.Semaphore(self.limit)
+        pushers = [asyncio.create_task(self._push(queue, connections)) for _ in range(self.limit)]
+        reporter = asyncio.create_task(self._report_every(REPORT_SECONDS))
+
+        pool = ProcessPoolExecutor(self.workers) if self.workers else nullcontext()
+        with pool:
+            pending = set()
+            for chunk in chunked(rows):
+                self.stats["read"] += len(chunk)
+                if not self.workers:
+                    await self._enqueue(queue, encode_chunk(self.session, chunk))
+                    continue
+                pending.add(loop.run_in_executor(pool, encode_chunk, self.session, chunk))
+                # Two chunks per worker keeps the pool busy without reading ahead
+                while len(pending) >= self.workers * 2:
+                    pending = await self._drain(queue, pending)
+            while pending:
+                pending = await self._drain(queue, pending)
+
+        for _ in pushers:
+            await queue.put(None)
+        await asyncio.gather(*pushers)
+        reporter.cancel()
+
+    async def _drain(self, queue, pending):
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            await self._enqueue(queue, future.result())
+        return pending
+
+    async def _enqueue(self, queue, encoded):
+        for line, vehicle, device, message, error in encoded:
+            if error is not None:
+                self.stats["invalid"] += 1
+                self._fail(line, vehicle, device, error)
+            elif self.dry_run:
+                self.stats["synced"] += 1
+            else:
+                await queue.put((line, vehicle, device, message))
+
+    async def _push(self, queue, connections):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line, vehicle, device, message = item
+            result = await sync_device(device, message, connections, self.timeout, 1)
+            if result.ok:
+                self.stats["synced"] += 1
+            else:
+                self.stats["failed"] += 1
+                self._fail(line, vehicle, device, result.error)
+
+    def _fail(self, line, vehicle, device, error):
+        if self.failures is not None:
+            self.failures.write(json.dumps({"line": line, "vehicle": vehicle, "device": device,
+                                            "error": error}) + "\n")
+
+    async def _report_every(self, seconds):
+        while True:
+            await asyncio.sleep(seconds)
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.start
+        done = self.stats["synced"] + self.stats["failed"] + self.stats["invalid"]
+        line = (f"provision: {self.stats['read']} read, {self.stats['synced']} "
+                f"{'valid' if self.dry_run else 'synced'}, {self.stats['failed']} failed, "
+                f"{self.stats['invalid']} invalid, {done / elapsed if elapsed else 0:.0f} rows/s")
+        if final:
+            line += f" over {elapsed:.1f} s{_peak_memory()}"
+        print(line, file=self.out)
+
+
+def _peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return ""
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mib = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return f", peak RSS {peak_mib:.0f} MiB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Provision HUD settings for a fleet from a JSONL or CSV export")
+    parser.add_argument("export", help=".jsonl or .csv, one vehicle per row")
+    parser.add_argument("--workers", type=int, default=None, help="encoding processes, 0 to encode inline")
+    parser.add_argument("--limit", type=int, default=FANOUT_LIMIT, help="devices in flight at once")
+    parser.add_argument("--timeout", type=float, default=DEVICE_TIMEOUT, help="seconds per device")
+    parser.add_argument("--failures", help="write invalid and failed rows here as JSONL")
+    parser.add_argument("--dry-run", action="store_true", help="validate and encode only")
+    args = parser.parse_args(argv)
+
+    failures = open(args.failures, "w", encoding="utf-8") if args.failures else nullcontext()
+    with failures:
+        provisioner = Provisioner(args.workers, args.limit, args.timeout,
+                                  failures if args.failures else None, args.dry_run)
+        try:
+            stats = provisioner.run(read_rows(args.export))
+        except OSError as e:
+            print(f"cannot read {args.export} ({e.strerror})", file=sys.stderr)
+            return EXIT_INVALID
+    if stats["invalid"]:
+        return EXIT_INVALID
+    if stats["failed"]:
+        return EXIT_SYNC_FAILED
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Feature combination rules, compiled to bitmask checks
+
+Rules are declared over FEATURE_TITLES and compiled once into hud_codec
+bitmasks:
+
+    requires("Speed Limits", "Speed Display")     Speed Limits is pointless without it
+    conflicts("Navigation", "Battery Range")      never on together
+
+RuleSet.valid(mask) is one lookup in a table covering every possible
+mask, valid_masks() does the same for a whole numpy array, and
+toggle() applies one switch change the way the UI needs it: turning a
+feature on pulls in what it requires and drops what it conflicts with,
+turning it off drops what depends on it.
+"""
+
+import os
+
+from hud_codec import ALL_FEATURES, FEATURE_BITS, pack_features, unpack_features
+
+# What the apps do with a toggle that breaks a rule: fix (switch the other
+# features to match), reject (put the switch back) or off
+RULES_MODE = os.environ.get("HUD_RULES", "fix")
+
+
+class Rule:
+    """One compiled rule: when every `when` bit is on, `need` must be on and `forbid` off"""
+    def __init__(self, when, need=0, forbid=0, message=""):
+        self.when = when
+        self.need = need
+        self.forbid = forbid
+        self.message = message
+
+    def broken(self, mask):
+        return mask & self.when == self.when and (mask & self.need != self.need or mask & self.forbid)
+
+
+def _bits(titles):
+    mask = 0
+    for title in titles:
+        if title not in FEATURE_BITS:
+            raise ValueError(f"rule names unknown feature {title!r}")
+        mask |= FEATURE_BITS[title]
+    return mask
+
+
+def requires(feature, *needed):
+    """feature only makes sense with every one of needed on"""
+    return Rule(_bits([feature]), need=_bits(needed), message=f"{feature} requires {', '.join(needed)}")
+
+
+def conflicts(feature, *others):
+    """feature cannot be on together with any of others"""
+    return Rule(_bits([feature]), forbid=_bits(others), message=f"{feature} conflicts with {', '.join(others)}")
+
+
+class RuleSet:
+    """Rules compiled into a validity table and per-feature toggle masks"""
+    def __init__(self, rules):
+        self.rules = list(rules)
+        table = bytearray(b"\x01") * (ALL_FEATURES + 1)
+        for rule in self.rules:
+            when, need, forbid = rule.when, rule.need, rule.forbid
+            for mask in range(ALL_FEATURES + 1):
+                if mask & when == when and (mask & need != need or mask & forbid):
+                    table[mask] = 0
+        self.table = bytes(table)
+        self._compile_toggles()
+
+    def _compile_toggles(self):
+        # Transitive closures over single-feature rules: what switching a
+        # feature on has to turn on (needs) and off (drops), and what
+        # switching it off takes down with it (dependents)
+        needs = {bit: bit for bit in FEATURE_BITS.values()}
+        changed = True
+        while changed:
+            changed = False
+            for rule in self.rules:
+                for bit, closure in needs.items():
+                    if closure & rule.when == rule.when and closure | rule.need != closure:
+                        needs[bit] = closure | rule.need
+                        changed = True
+        dependents = {bit: sum(other for other, closure in needs.items() if closure & bit)
+                      for bit in FEATURE_BITS.values()}
+
+        self.turn_on = {}
+        self.turn_off = {}
+        for title, bit in FEATURE_BITS.items():
+            forbid = 0
+            for rule in self.rules:
+                if needs[bit] & rule.when == rule.when:
+                    forbid |= rule.forbid
+                elif needs[bit] & rule.forbid:
+                    # Conflicts cut both ways, the other side goes
+                    forbid |= rule.when & ~needs[bit]
+            drops = 0
+            for other in FEATURE_BITS.values():
+                if forbid & other:
+                    drops |= dependents[other]
+            if drops & needs[bit]:
+                raise ValueError(f"rules make {title} impossible to turn on")
+            self.turn_on[title] = (needs[bit], drops)
+            self.turn_off[title] = dependents[bit]
+
+    def valid(self, mask):
+        return bool(self.table[mask])
+
+    def violations(self, mask):
+        """Messages of every rule the mask breaks"""
+        return [rule.message for rule in self.rules if rule.broken(mask)]
+
+    def normalized(self, mask):
+        """mask with the features of broken rules switched off until every rule holds"""
+        while not self.table[mask]:
+            for rule in self.rules:
+                if rule.broken(mask):
+                    mask &= ~rule.when
+        return mask
+
+    def valid_masks(self, masks):
+        """Boolean numpy array, one entry per mask in masks"""
+        import numpy as np
+        return np.frombuffer(self.table, dtype=np.bool_)[masks]
+
+    def toggled(self, mask, title, on):
+        """The mask after switching title, with the other features fixed up"""
+        if on:
+            needs, drops = self.turn_on[title]
+            return (mask | needs) & ~drops
+        return mask & ~self.turn_off[title]
+
+    def toggle(self, feature_states, title, on, mode=None):
+        """Apply one switch change to {title: bool} settings under the rules
+
+        Returns (changes, broken): changes maps every title whose state
+        changes, the toggled one included, to its new state. In reject mode
+        a toggle that breaks a rule gives no changes and the rule messages;
+        rules the settings already broke before the toggle do not count.
+        """
+        if title not in FEATURE_BITS:
+            # Catalog features outside the codec bitmask have no rules
+            return {title: on}, []
+        mode = mode or RULES_MODE
+        mask = pack_features(feature_states)
+        plain = mask | FEATURE_BITS[title] if on else mask & ~FEATURE_BITS[title]
+        if mode == "fix":
+            new_mask = self.toggled(mask, title, on)
+        elif mode == "reject" and not self.valid(plain):
+            broken = [message for message in self.violations(plain) if message not in self.violations(mask)]
+            if broken:
+                return {}, broken
+            new_mask = plain
+        else:
+            new_mask = plain
+        changes = unpack_features(new_mask, mask ^ new_mask)
+        changes[title] = on
+        return changes, []
+
+
+def side_effects(changes, title):
+    """', Speed Display turned on too' for the features a fix switched besides title"""
+    others = [f"{other} turned {'on' if on else 'off'}" for other, on in changes.items() if other != title]
+    return f", {', '.join(others)} too" if others else ""
+
+
+# The hardware's rules, keep to titles in FEATURE_TITLES
+FEATURE_RULES = (
+    requires("Speed Limits", "Speed Display"),
+    requires("Takeover Alerts", "Autopilot Status"),
+)
+
+RULES = RuleSet(FEATURE_RULES)
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from hud_codec import FEATURE_TITLES, THEME_NAMES, pack_features, unpack_features
+from hud_files import atomic_write
+from hud_rules import RULES
+
+# Settings file, override with HUD_SETTINGS_FILE
+STORE_PATH = Path(os.environ.get("HUD_SETTINGS_FILE", Path.home() / ".hud_settings.json"))
+
+STORE_VERSION = 1
+DEFAULT_THEME = "Dark"
+
+
+def load_catalog(path=None):
+    """Feature titles the apps list: FEATURE_TITLES, then any HUD_CATALOG extras
+
+    HUD_CATALOG names a JSON file with the vehicle's further HUD options,
+    a list of titles or {"features": [...]}. Extras have no bit in the
+    hud_codec frame and no hud_rules rules; they are synced and saved by
+    title like the rest. A missing or malformed file leaves the catalog at
+    FEATURE_TITLES.
+    """
+    if path is None:
+        path = os.environ.get("HUD_CATALOG", "")
+    if not path:
+        return FEATURE_TITLES
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        print(f"ignoring HUD_CATALOG={path!r} ({e})", file=sys.stderr)
+        return FEATURE_TITLES
+    titles = data.get("features") if isinstance(data, dict) else data
+    if not isinstance(titles, list) or not all(isinstance(title, str) and title for title in titles):
+        print(f"ignoring HUD_CATALOG={path!r}, expected a list of feature titles", file=sys.stderr)
+        return FEATURE_TITLES
+    extras = [title for title in dict.fromkeys(titles) if title not in FEATURE_TITLES]
+    return FEATURE_TITLES + tuple(extras)
+
+
+def default_settings(titles=FEATURE_TITLES):
+    """Settings for a first launch, everything off and never synced"""
+    return {
+        "features": {title: False for title in titles},
+        "theme": DEFAULT_THEME,
+        "synced": None,
+        "synced_theme": None,
+    }
+
+
+class SettingsError(ValueError):
+    """Raised when a settings file names features or themes the HUD does not have"""
+
+
+def validate_settings(data, check_rules=True, titles=FEATURE_TITLES):
+    """(feature_states, theme) from a settings document, or SettingsError
+
+    Unlike load_settings nothing is silently dropped, this is for files a
+    person or a provisioning script wrote. Features are the list of enabled
+    titles, as saved here, or a {title: bool} mapping; unlisted titles are off.
+    Combinations that break hud_rules.RULES are rejected too, unless
+    check_rules is False, for state read back from vehicles as it is.
+    Pass a load_catalog() result as titles to accept catalog features.
+    """
+    if not isinstance(data, dict):
+        raise SettingsError("settings must be a JSON object")
+    features = data.get("features", ())
+    if isinstance(features, dict):
+        for title, on in features.items():
+            if not isinstance(on, bool):
+                raise SettingsError(f"feature {title!r} must be true or false, not {on!r}")
+        enabled = [title for title, on in features.items() if on]
+        named = list(features)
+    elif isinstance(features, list):
+        enabled = named = features
+    else:
+        raise SettingsError("features must be a list of titles or a {title: bool} object")
+    unknown = [title for title in named if title not in titles]
+    if unknown:
+        raise SettingsError(f"unknown features: {', '.join(map(str, unknown))}")
+    theme = data.get("theme", DEFAULT_THEME)
+    if theme not in THEME_NAMES:
+        raise SettingsError(f"unknown theme {theme!r}, expected one of {', '.join(THEME_NAMES)}")
+    feature_states = {title: title in enabled for title in titles}
+    mask = pack_features(feature_states)
+    if check_rules and not RULES.valid(mask):
+        raise SettingsError("; ".join(RULES.violations(mask)))
+    return feature_states, theme
+
+
+def load_settings(path=STORE_PATH, titles=FEATURE_TITLES):
+    """Read saved settings, falling back to defaults if the file is missing or bad
+
+    Features are stored as the list of enabled titles, titles that are no
+    longer in titles (FEATURE_TITLES, or the app's load_catalog()) are
+    dropped, and features whose rules no longer hold (an older file, a hand
+    edit) are switched off.
+    """
+    settings = default_settings(titles)
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError):
+        return settings
+    if not isinstance(data, dict) or data.get("version") != STORE_VERSION:
+        return settings
+
+    features = settings["features"]
+    for title in data.get("features", ()):
+        if title in features:
+            features[title] = True
+    features.update(unpack_features(RULES.normalized(pack_features(features))))
+    if data.get("theme") in THEME_NAMES:
+        settings["theme"] = data["theme"]
+
+    synced = data.get("synced")
+    if isinstance(synced, dict) and synced.get("theme") in THEME_NAMES:
+        enabled = set(synced.get("features", ()))
+        settings["synced"] = {title: title in enabled for title in titles}
+        settings["synced_theme"] = synced["theme"]
+    return settings
+
+
+def save_settings(feature_states, theme, synced=None, synced_theme=None, path=STORE_PATH):
+    """Write settings atomically, a crash leaves either the old or the new file"""
+    data = {
+        "version": STORE_VERSION,
+        "features": [title for title, on in feature_states.items() if on],
+        "theme": theme,
+    }
+    if synced is not None:
+        data["synced"] = {
+            "features": [title for title, on in synced.items() if on],
+            "theme": synced_theme,
+        }
+
+    atomic_write(path, json.dumps(data, separators=(",", ":")))
@@ -0,0 +1,608 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from hud_clock import clock_for
+from hud_metrics import METRICS, record_sync
+
+# Default HUD device address, override with HUD_DEVICE=tcp://host:port or udp://host:port
+# A comma-separated list of addresses syncs every device at once
+DEFAULT_DEVICE = "tcp://127.0.0.1:47800"
+
+
+def _positive_from_env(name, default, kind):
+    """kind(os.environ[name]) when it is set and > 0, otherwise default"""
+    setting = os.environ.get(name, "")
+    if not setting:
+        return default
+    try:
+        value = kind(setting)
+    except ValueError:
+        value = 0
+    # A bad value must not stop the apps or hud_cli from importing, the default applies
+    if not 0 < value < float("inf"):
+        print(f"ignoring {name}={setting!r}, expected a number > 0", file=sys.stderr)
+        return default
+    return value
+
+
+# Fan-out: devices synced at the same time, and how long each one gets
+FANOUT_LIMIT = _positive_from_env("HUD_FANOUT_LIMIT", 16, int)
+DEVICE_TIMEOUT = _positive_from_env("HUD_DEVICE_TIMEOUT", 3.0, float)
+
+# Auto-sync, off unless set: HUD_AUTO_SYNC=quiet_ms[,max_syncs_per_second]
+AUTO_SYNC = os.environ.get("HUD_AUTO_SYNC", "")
+
+# Progress events a sync reports, in order, with their status text
+SYNC_STAGES = {
+    "connecting": "Connecting to device...",
+    "sending": "Sending settings...",
+    "acked": "Device acknowledged",
+}
+
+
+class SyncError(Exception):
+    """Raised when settings could not be delivered to the device"""
+
+
+class LinkLost(SyncError):
+    """Raised when an open link turns out to be dead, reconnecting may help"""
+
+
+class TcpTransport:
+    """Line-based TCP link to a HUD device, kept open between syncs"""
+    def __init__(self, host, port, timeout=3.0):
+        self.host = host
+        self.port = port
+        self.address = f"tcp://{host}:{port}"
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.last_retries = 0
+
+    def connect(self):
+        """Open the connection if needed, returns True when it is a new one"""
+        if self.sock is not None:
+            return False
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise SyncError(f"cannot reach {self.host}:{self.port} ({e})")
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        return True
+
+    def exchange(self, data, seq=None):
+        """Send one message and wait for the device reply, TCP does the resending"""
+        try:
+            self.sock.sendall(data + b"\n")
+            reply = self.reader.readline()
+        except OSError as e:
+            self.close()
+            raise LinkLost(f"link to {self.host}:{self.port} lost ({e})")
+        if not reply:
+            self.close()
+            raise LinkLost(f"device {self.host}:{self.port} closed the connection")
+        return reply.rstrip(b"\n")
+
+    def close(self):
+        """Drop the connection, the next sync reconnects"""
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+
+class UdpTransport:
+    """Datagram link to a HUD device, one message per packet
+
+    An unacked message is resent with exponential backoff, starting at
+    timeout and capped at max_timeout per attempt. Replies carry the seq
+    they acknowledge, so a late ack for an earlier message is skipped rather
+    than taken for this one. A message that never gets through leaves the
+    socket open: its changes stay dirty and ride the next delta.
+    """
+    def __init__(self, host, port, timeout=0.2, retries=6, max_timeout=1.6):
+        self.host = host
+        self.port = port
+        self.address = f"udp://{host}:{port}"
+        self.timeout = timeout
+        self.retries = retries
+        self.max_timeout = max_timeout
+        self.sock = None
+        self.last_retries = 0
+
+    def connect(self):
+        """Create the socket if needed, returns True when it is a new one"""
+        if self.sock is not None:
+            return False
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.connect((self.host, self.port))
+        except OSError as e:
+            sock.close()
+            raise SyncError(f"cannot reach {self.host}:{self.port} ({e})")
+        self.sock = sock
+        return True
+
+    def exchange(self, data, seq=None):
+        """Send one datagram and wait for its ack, resending with backoff"""
+        for attempt in range(self.retries):
+            self.last_retries = attempt
+            deadline = time.monotonic() + min(self.timeout * 2 ** attempt, self.max_timeout)
+            try:
+                self.sock.send(data)
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.sock.settimeout(remaining)
+                    reply = self.sock.recv(65535)
+                    if seq is None or acked_seq(reply) in (None, seq):
+                        return reply
+            except socket.timeout:
+                continue
+            except OSError as e:
+                self.close()
+                raise LinkLost(f"link to {self.host}:{self.port} lost ({e})")
+        raise SyncError(f"no reply from {self.host}:{self.port}")
+
+    def close(self):
+        """Drop the socket, the next sync recreates it"""
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+
+
+def acked_seq(reply):
+    """The seq a device reply acknowledges, None when it does not say"""
+    try:
+        return json.loads(reply).get("seq")
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_address(address):
+    """(scheme, host, port) from tcp://host:port, udp://host:port or host:port"""
+    scheme, _, rest = address.strip().rpartition("://")
+    host, _, port = rest.rpartition(":")
+    scheme = scheme or "tcp"
+    if scheme not in ("tcp", "udp"):
+        raise ValueError(f"unsupported device address: {address}")
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"device address needs a port, like tcp://host:47800: {address}")
+    return scheme, host or "127.0.0.1", int(port)
+
+
+def transport_from_address(address=None):
+    """Build a transport for HUD_DEVICE, fanning out when it lists several devices"""
+    address = address or os.environ.get("HUD_DEVICE", DEFAULT_DEVICE)
+    if "," in address:
+        # asyncio is only loaded when there is more than one device
+        from hud_fanout import FanoutTransport
+        return FanoutTransport(part for part in address.split(",") if part.strip())
+    scheme, host, port = parse_address(address)
+    if scheme == "tcp":
+        return TcpTransport(host, port)
+    return UdpTransport(host, port)
+
+
+class DirtyTracker:
+    """Tracks which settings changed since the device last acknowledged them
+
+    Works on the app's live feature_states dict. Until the device has acked a
+    full snapshot there is no baseline and every sync has to be a full one.
+    A baseline saved by a previous run can be passed in as acked.
+    """
+    def __init__(self, feature_states, theme, acked=None, acked_theme=None):
+        self.states = feature_states
+        self.theme = theme
+        self.acked = dict(acked) if acked is not None else None
+        self.acked_theme = acked_theme
+        if self.acked is None:
+            self.dirty = set(feature_states)
+        else:
+            self.dirty = {name for name, on in feature_states.items() if self.acked.get(name) != on}
+        self.theme_dirty = theme != acked_theme
+
+    def mark(self, name):
+        """Record a feature toggle, toggling back to the acked value clears it"""
+        if self.acked is not None and self.acked.get(name) == self.states[name]:
+            self.dirty.discard(name)
+        else:
+            self.dirty.add(name)
+
+    def mark_theme(self, theme):
+        """Record a theme change"""
+        self.theme = theme
+        self.theme_dirty = theme != self.acked_theme
+
+    @property
+    def pending(self):
+        """Number of settings waiting for the next sync"""
+        return len(self.dirty) + self.theme_dirty
+
+    def delta(self):
+        """Changes since the last ack, or None when a full sync is required"""
+        if self.acked is None:
+            return None
+        changes = {"full": False, "features": {name: self.states[name] for name in self.dirty}}
+        if self.theme_dirty:
+            changes["theme"] = self.theme
+        return changes
+
+    def acknowledge(self, payload):
+        """Fold a payload the device acked into the baseline"""
+        if payload.get("full"):
+            self.acked = dict(payload["features"])
+        else:
+            self.acked.update(payload["features"])
+        if "theme" in payload:
+            self.acked_theme = payload["theme"]
+        # Toggles made while the sync was in flight stay dirty
+        self.dirty = {name for name, on in self.states.items() if self.acked.get(name) != on}
+        self.theme_dirty = self.theme != self.acked_theme
+
+
+class SyncResult:
+    """Outcome of one sync, handed to the app's sync_complete"""
+    def __init__(self, ok, payload=None, error=None, elapsed=0.0, summary=None, retries=0,
+                 size=0, devices=None):
+        self.ok = ok
+        self.payload = payload
+        self.error = error
+        self.elapsed = elapsed
+        self.summary = summary
+        self.retries = retries
+        self.bytes = size
+        # Fan-out only: {address: SyncResult} for each device
+        self.devices = devices
+
+
+class DeviceLink:
+    """Sequenced, acked pushes over one transport, with no Tk involved
+
+    Every message carries this link's session id and an increasing seq, so
+    the device can ack duplicates and drop stale messages without applying
+    them twice. Replies name the device's boot id; if it changes under a
+    delta the device lost its state and gets one full snapshot right away.
+    """
+    def __init__(self, transport):
+        self.transport = transport
+        self.session = os.urandom(4).hex()
+        self.seq = 0
+        self.sent_bytes = 0
+        self.boot = None
+
+    def push(self, snapshot, delta=None, emit=None):
+        """Send the delta, or the full snapshot when it has to be, returns a SyncResult"""
+        emit = emit or (lambda stage: None)
+        start = time.perf_counter()
+        payload = snapshot
+        retries = 0
+        self.transport.last_retries = 0
+        self.sent_bytes = 0
+        try:
+            emit("connecting")
+            reused = not self.transport.connect()
+            # A new connection may mean a rebooted device, resync everything
+            if reused and delta is not None:
+                payload = delta
+                if not payload["features"] and "theme" not in payload:
+                    return SyncResult(True, payload)
+            emit("sending")
+            try:
+                reply = self._send(payload)
+            except LinkLost:
+                if not reused:
+                    raise
+                # The device dropped the idle link (reboot, NAT timeout), reopen
+                # it once and resend everything, its state may be gone too
+                self.transport.connect()
+                payload = snapshot
+                reply = self._send(payload)
+                retries += 1
+            retries += self.transport.last_retries
+            if not payload.get("full") and self._rebooted(reply):
+                payload = snapshot
+                reply = self._send(payload)
+                retries += self.transport.last_retries
+            self._rebooted(reply)
+        except (SyncError, ValueError) as e:
+            retries += self.transport.last_retries
+            return SyncResult(False, payload, str(e), time.perf_counter() - start, retries=retries,
+                              size=self.sent_bytes, devices=getattr(self.transport, "results", None))
+        emit("acked")
+        return SyncResult(True, payload, elapsed=time.perf_counter() - start,
+                          summary=reply.get("summary"), retries=retries,
+                          size=self.sent_bytes, devices=getattr(self.transport, "results", None))
+
+    def close(self):
+        self.transport.close()
+
+    def _send(self, payload):
+        """One message with the next seq, returns the parsed ack"""
+        self.seq += 1
+        message = json.dumps(dict(payload, session=self.session, seq=self.seq)).encode()
+        self.sent_bytes += len(message)
+        reply = json.loads(self.transport.exchange(message, self.seq))
+        if not reply.get("ok"):
+            raise SyncError(reply.get("error", "device rejected settings"))
+        return reply
+
+    def _rebooted(self, reply):
+        """Note the device's boot id, True when it changed since the last ack"""
+        boot = reply.get("boot")
+        changed = boot is not None and self.boot is not None and boot != self.boot
+        if boot is not None:
+            self.boot = boot
+        return changed
+
+
+class SyncEngine:
+    """Pushes settings to the device on a worker thread
+
+    Tk is not thread safe, so the worker never touches widgets. Progress
+    events and results are queued and picked up on the root's animation
+    clock, which only ticks while a sync is in flight, then delivered to the
+    callbacks on the Tk thread. Nothing pumps the event loop from inside a
+    handler. The wire protocol itself is DeviceLink's.
+
+    A malformed HUD_DEVICE does not stop the app: error holds the reason,
+    no worker is started and every sync fails with it.
+    """
+    def __init__(self, root, transport=None, metrics=METRICS):
+        self.root = root
+        self.clock = clock_for(root)
+        self.error = None
+        if transport is None:
+            try:
+                transport = transport_from_address()
+            except ValueError as e:
+                self.error = f"bad HUD_DEVICE ({e})"
+        self.transport = transport
+        self.link = DeviceLink(transport) if transport is not None else None
+        self.metrics = metrics
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.worker = threading.Thread(target=self._run, name="hud-sync", daemon=True)
+        if self.link is not None:
+            self.worker.start()
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def sync(self, feature_states, theme, callback, delta=None, progress=None):
+        """Queue a snapshot of the settings, callback(result) runs on the Tk thread
+
+        With a delta from DirtyTracker only the changes are sent, unless the
+        link has to be reopened, in which case the device gets everything.
+        progress(stage) is called with each SYNC_STAGES key as it happens.
+        """
+        snapshot = {"full": True, "features": dict(feature_states), "theme": theme}
+        self.pending += 1
+        if self.link is None:
+            self.results.put((True, SyncResult(False, snapshot, self.error), callback))
+        else:
+            self.jobs.put((snapshot, delta, callback, progress))
+        self.clock.add(self._poll)
+
+    def close(self):
+        """Stop the worker and release the link"""
+        self.clock.remove(self._poll)
+        self.jobs.put(None)
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.link.close()
+                return
+            snapshot, delta, callback, progress = job
+
+            def emit(stage):
+                if progress is not None:
+                    self.results.put((False, stage, progress))
+
+            try:
+                result = self.link.push(snapshot, delta, emit)
+            except Exception as e:
+                # Whatever a transport raises, the worker lives on and the app hears about it
+                self.link.close()
+                result = SyncResult(False, snapshot, f"sync failed ({e})")
+            self.results.put((True, result, callback))
+
+    def _poll(self, now):
+        while True:
+            try:
+                final, value, callback = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if final:
+                self.pending -= 1
+                self._record(value)
+            callback(value)
+        return self.pending > 0
+
+    def _record(self, result):
+        """Feed the metrics registry, per device when fanning out"""
+        if result.ok and not result.bytes or self.transport is None:
+            return  # nothing was sent, the delta was empty or there is no device
+        for device, device_result in (result.devices or {self.transport.address: result}).items():
+            record_sync(self.metrics, device, device_result)
+        self.metrics.export()
+
+
+class AutoSync:
+    """Coalesces bursts of setting changes into a single sync
+
+    Every change restarts a quiet-period timer, the sync fires once the user
+    stops toggling. At most one sync is in flight and syncs are spaced at
+    least 1/max_per_second apart; changes made meanwhile ride the next one.
+    A failed sync is retried on its own, backing off from retry_ms up to
+    max_retry_ms while the device stays unreachable.
+    """
+    def __init__(self, root, fire, quiet_ms=400, max_per_second=2.0, retry_ms=1000, max_retry_ms=30000):
+        self.root = root
+        self.fire = fire
+        self.quiet_ms = quiet_ms
+        self.min_interval = 1.0 / max_per_second
+        self.retry_ms = retry_ms
+        self.max_retry_ms = max_retry_ms
+        self.failures = 0
+        self.timer = None
+        self.last_fire = float("-inf")
+        self.in_flight = False
+        self.deferred = False
+
+    def poke(self):
+        """Note a change and restart the quiet period"""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+        self.timer = self.root.after(self.quiet_ms, self._due)
+
+    def done(self, ok=True):
+        """Call from sync_complete, flushes changes made during the sync or retries a failed one"""
+        self.in_flight = False
+        if not ok:
+            # The retry carries whatever changed meanwhile as well
+            self.deferred = False
+            delay = min(self.retry_ms * 2 ** self.failures, self.max_retry_ms)
+            self.failures += 1
+            self.cancel()
+            self.timer = self.root.after(delay, self._due)
+            return
+        self.failures = 0
+        if self.deferred:
+            self.deferred = False
+            self._due()
+
+    def cancel(self):
+        """Drop any scheduled sync"""
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def _due(self):
+        self.timer = None
+        if self.in_flight:
+            self.deferred = True
+            return
+        wait = self.last_fire + self.min_interval - time.monotonic()
+        if wait > 0:
+            self.timer = self.root.after(int(wait * 1000) + 1, self._due)
+            return
+        self.last_fire = time.monotonic()
+        self.in_flight = True
+        self.fire()
+
+
+def auto_sync_from_env(root, fire, setting=AUTO_SYNC):
+    """AutoSync configured from HUD_AUTO_SYNC, or None when it is off or malformed"""
+    if not setting:
+        return None
+    quiet_ms, _, rate = setting.partition(",")
+    try:
+        quiet_ms = int(quiet_ms)
+        rate = float(rate or 2.0)
+    except ValueError:
+        quiet_ms = rate = -1
+    # A bad value must not stop the app from starting, auto-sync just stays off
+    if quiet_ms < 0 or not 0 < rate < float("inf"):
+        print(f"ignoring HUD_AUTO_SYNC={setting!r}, expected quiet_ms[,max_syncs_per_second > 0]",
+              file=sys.stderr)
+        return None
+    return AutoSync(root, fire, quiet_ms, rate)
+
+
+class _DeviceHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(_apply(line) + b"\n")
+
+
+class _DatagramHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        sock.sendto(_apply(data), self.client_address)
+
+
+_device_state = {"features": {}, "theme": None, "verbose": True,
+                 "boot": os.urandom(4).hex(), "session": None, "seq": None}
+_device_lock = threading.Lock()
+
+
+def _apply(data):
+    try:
+        payload = json.loads(data)
+    except ValueError as e:
+        return json.dumps({"ok": False, "error": str(e)}).encode()
+    seq = payload.get("seq")
+    ack = {"ok": True, "boot": _device_state["boot"]}
+    if seq is not None:
+        ack["seq"] = seq
+    with _device_lock:
+        # Resent or overtaken messages are acked again but not re-applied
+        if seq is not None and _device_state["seq"] is not None \
+                and payload.get("session") == _device_state["session"] and seq <= _device_state["seq"]:
+            ack["duplicate"] = True
+            return json.dumps(ack).encode()
+        if seq is not None:
+            _device_state["session"] = payload.get("session")
+            _device_state["seq"] = seq
+        if payload.get("full"):
+            _device_state["features"] = {}
+        _device_state["features"].update(payload.get("features", {}))
+        _device_state["theme"] = payload.get("theme", _device_state["theme"])
+        enabled = [name for name, on in _device_state["features"].items() if on]
+    if _device_state["verbose"]:
+        kind = "full" if payload.get("full") else f"delta of {len(payload.get('features', {}))}"
+        print(f"device: {kind}, theme={_device_state['theme']} enabled={enabled}")
+    return json.dumps(ack).encode()
+
+
+def start_device(port=47800, verbose=True):
+    """Start a local stand-in HUD device on TCP and UDP in background threads
+
+    Port 0 picks a free port, read it back from tcp.server_address.
+    """
+    _device_state["verbose"] = verbose
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    tcp = socketserver.ThreadingTCPServer(("127.0.0.1", port), _DeviceHandler)
+    udp = socketserver.UDPServer(("127.0.0.1", tcp.server_address[1]), _DatagramHandler)
+    # A full snapshot of a large HUD_CATALOG is well past socketserver's 8 KiB default
+    udp.max_packet_size = 65507
+    for server in (tcp, udp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return tcp, udp
+
+
+def serve(port=47800):
+    """Run a local stand-in HUD device until interrupted"""
+    tcp, udp = start_device(port)
+    print(f"HUD device stand-in listening on 127.0.0.1:{port} (tcp+udp)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    tcp.shutdown()
+    udp.shutdown()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else 47800)
+    else:
+        print("usage: python hud_sync.py --serve [port]")
@@ -0,0 +1,154 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# One frame at 60 Hz, a theme switch should repaint within it
+FRAME_BUDGET_MS = 1000 / 60
+
+# Surface colors per appearance mode
+BASE_PALETTES = {
+    "dark": {
+        "window_bg": "#000000",
+        "panel_bg": "#1a1a1a",
+        "card_bg": "#2b2b2b",
+        "text_primary": "#FFFFFF",
+        "text_secondary": "#AAAAAA",
+        "button_idle": "#333333",
+        "button_text": "#FFFFFF",
+        "scrollbar": "#333333",
+        "scrollbar_hover": "#555555",
+        "switch_off": "#525252",
+        "switch_on": "#32D74B",
+    },
+    "light": {
+        "window_bg": "#F2F2F7",
+        "panel_bg": "#FFFFFF",
+        "card_bg": "#FFFFFF",
+        "text_primary": "#1C1C1E",
+        "text_secondary": "#6C6C70",
+        "button_idle": "#E5E5EA",
+        "button_text": "#1C1C1E",
+        "scrollbar": "#C7C7CC",
+        "scrollbar_hover": "#AEAEB2",
+        "switch_off": "#939393",
+        "switch_on": "#32D74B",
+    },
+}
+
+# Accent and accent hover per customtkinter color theme name
+ACCENTS = {
+    "blue": ("#007AFF", "#0051D5"),
+    "green": ("#32D74B", "#248A3D"),
+    "dark-blue": ("#5E5CE6", "#3634A3"),
+}
+
+
+def system_appearance():
+    """'dark' or 'light' from the OS, dark when it cannot be detected"""
+    try:
+        import darkdetect
+        return "light" if darkdetect.theme() == "Light" else "dark"
+    except Exception:
+        return "dark"
+
+
+def compile_theme(config, system_mode="dark"):
+    """Flatten a HUDApp.themes entry into a full role -> color table"""
+    mode = config["appearance_mode"]
+    if mode == "system":
+        mode = system_mode
+    palette = dict(BASE_PALETTES[mode])
+    palette["accent"], palette["accent_hover"] = ACCENTS[config["color_theme"]]
+    return palette
+
+
+# What the widgets looked like before theming existed: Dark with blue accents
+DEFAULT_PALETTE = compile_theme({"appearance_mode": "dark", "color_theme": "blue"})
+
+
+@contextmanager
+def held_redraws(widgets):
+    """Defer customtkinter redraws in the windows of widgets, yields what to redraw
+
+    Every configure() redraws a CTk widget, and a frame that changes
+    fg_color passes it down to each child as bg_color, so a card's label
+    would be drawn once for the card and again for its own text color.
+    Inside the block redraws are only recorded, afterwards each widget that
+    asked is drawn once by the caller.
+    """
+    redraw = {}
+    held = []
+    for top in {widget.winfo_toplevel() for widget in widgets}:
+        stack = [top]
+        while stack:
+            widget = stack.pop()
+            stack.extend(widget.winfo_children())
+            if hasattr(widget, "_draw"):
+                # Shadow the bound method, del brings the class one back
+                widget._draw = lambda *args, widget=widget, **kwargs: redraw.setdefault(widget)
+                held.append(widget)
+    try:
+        yield redraw
+    finally:
+        for widget in held:
+            del widget._draw
+
+
+class ThemeEngine:
+    """Repaints registered widgets when the theme changes
+
+    Palettes are compiled once up front. Widgets are registered with the
+    role each color option plays, and a switch only reconfigures widgets
+    whose roles resolve to a different color, one configure() per widget
+    and at most one redraw. Painters cover widgets whose colors depend on
+    more than the theme.
+    on_apply(theme_name, elapsed_ms, widget_count) is called after each
+    switch for timing.
+    """
+    def __init__(self, themes, current, on_apply=None):
+        system_mode = system_appearance()
+        self.palettes = {name: compile_theme(config, system_mode) for name, config in themes.items()}
+        self.current = current
+        self.palette = self.palettes[current]
+        self.roles = defaultdict(list)
+        self.painters = []
+        self.on_apply = on_apply
+        self.last_apply_ms = 0.0
+
+    def register(self, widget, **roles):
+        """Track widget, e.g. register(label, text_color="text_primary")
+
+        The widget is expected to have been built with the current palette.
+        """
+        for option, role in roles.items():
+            self.roles[role].append((widget, option))
+        return widget
+
+    def add_painter(self, painter):
+        """Call painter(palette) on every theme switch"""
+        self.painters.append(painter)
+
+    def apply(self, name):
+        """Switch to theme name, repainting only what changes"""
+        start = time.perf_counter()
+        palette = self.palettes[name]
+        updates = defaultdict(dict)
+        for role, color in palette.items():
+            if self.palette.get(role) == color:
+                continue
+            for widget, option in self.roles.get(role, ()):
+                updates[widget][option] = color
+        with held_redraws(updates) as redraw:
+            for widget, options in updates.items():
+                widget.configure(**options)
+
+            self.current = name
+            self.palette = palette
+            for painter in self.painters:
+                painter(palette)
+        for widget in redraw:
+            widget._draw()
+
+        self.last_apply_ms = (time.perf_counter() - start) * 1000
+        if self.on_apply:
+            self.on_apply(name, self.last_apply_ms, len(updates))
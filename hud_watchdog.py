@@ -0,0 +1,121 @@
+import functools
+import os
+import sys
+import time
+import tkinter
+from collections import deque
+
+# Stall watchdog, off unless set: HUD_WATCHDOG=threshold_ms[,heartbeat_ms]
+WATCHDOG = os.environ.get("HUD_WATCHDOG", "")
+
+
+class StallWatchdog:
+    """Finds the Tk-thread callbacks behind UI hitches
+
+    A heartbeat scheduled every heartbeat_ms measures how late the event
+    loop runs it. Instrumented handlers and every after() job are timed,
+    and anything slower than threshold_ms lands in a ring buffer with its
+    qualified name, as does each heartbeat that arrived that late.
+    """
+    def __init__(self, root, threshold_ms=50.0, heartbeat_ms=100, size=256):
+        self.root = root
+        self.threshold_ms = threshold_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.slow = deque(maxlen=size)  # (wall time, name, duration_ms)
+        self.max_lag_ms = 0.0
+        self.beat_job = None
+        self.expected = None
+        self._original_after = None
+
+    def wrap(self, callback, name=None):
+        """Timed version of callback, logged when it runs over the threshold"""
+        if getattr(callback, "_watchdog", None) is self:
+            return callback
+        name = name or getattr(callback, "__qualname__", None) or repr(callback)
+
+        @functools.wraps(callback)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms > self.threshold_ms:
+                    self.slow.append((time.time(), name, elapsed_ms))
+
+        timed._watchdog = self
+        return timed
+
+    def instrument(self, obj, *method_names):
+        """Time these methods of obj, before they are handed out as commands"""
+        for method_name in method_names:
+            setattr(obj, method_name, self.wrap(getattr(obj, method_name)))
+
+    def start(self):
+        """Start the heartbeat and time every after() job from here on"""
+        if self._original_after is not None:
+            return
+        original = self._original_after = tkinter.Misc.after
+        watchdog = self
+
+        def after(widget, ms, func=None, *args):
+            if func is None:
+                return original(widget, ms)
+            return original(widget, ms, watchdog.wrap(func), *args)
+
+        tkinter.Misc.after = after
+        self.expected = time.perf_counter() + self.heartbeat_ms / 1000
+        self.beat_job = original(self.root, self.heartbeat_ms, self._beat)
+
+    def stop(self, dump=True):
+        """Remove the hooks, printing what was caught unless dump is False"""
+        if self._original_after is None:
+            return
+        tkinter.Misc.after = self._original_after
+        if self.beat_job is not None:
+            try:
+                self.root.after_cancel(self.beat_job)
+            except tkinter.TclError:
+                pass
+        self.beat_job = None
+        self._original_after = None
+        if dump and self.slow:
+            self.dump()
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag_ms = (now - self.expected) * 1000
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms > self.threshold_ms:
+            self.slow.append((time.time(), "<event loop lag>", lag_ms))
+        self.expected = now + self.heartbeat_ms / 1000
+        self.beat_job = self._original_after(self.root, self.heartbeat_ms, self._beat)
+
+    def dump(self, file=None):
+        """Write the ring buffer, oldest first"""
+        file = file or sys.stderr
+        print(f"watchdog: {len(self.slow)} callbacks over {self.threshold_ms:.0f} ms, "
+              f"worst event loop lag {self.max_lag_ms:.1f} ms", file=file)
+        for wall, name, elapsed_ms in self.slow:
+            stamp = time.strftime("%H:%M:%S", time.localtime(wall))
+            print(f"  {stamp} {elapsed_ms:8.1f} ms  {name}", file=file)
+
+
+def watchdog_from_env(root, setting=WATCHDOG):
+    """Started StallWatchdog configured from HUD_WATCHDOG, or None when it is off or malformed"""
+    if not setting:
+        return None
+    threshold_ms, _, heartbeat_ms = setting.partition(",")
+    try:
+        threshold_ms = float(threshold_ms)
+        heartbeat_ms = int(heartbeat_ms or 100)
+    except ValueError:
+        threshold_ms = heartbeat_ms = -1
+    # A bad value must not stop the app from starting, the watchdog just stays off
+    if not 0 <= threshold_ms < float("inf") or heartbeat_ms <= 0:
+        print(f"ignoring HUD_WATCHDOG={setting!r}, expected threshold_ms[,heartbeat_ms > 0]",
+              file=sys.stderr)
+        return None
+    watchdog = StallWatchdog(root, threshold_ms, heartbeat_ms)
+    watchdog.start()
+    return watchdog
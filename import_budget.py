@@ -0,0 +1,91 @@
+"""
+Import-time report for the app entry points, in the style of -X importtime
+
+Each entry point is imported in a fresh interpreter with -X importtime, the
+self time of every module is summed per top-level package, and the total is
+compared against import_baseline.json. Headless entry points also fail the
+check if they pull in a GUI toolkit at all.
+
+    python import_budget.py            report and check against the baseline
+    python import_budget.py --update   record the current numbers as baseline
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ENTRY_POINTS = ["main", "main_clean", "enhanced_ui", "hud_cli"]
+HEADLESS = {"hud_cli"}
+GUI_PACKAGES = {"tkinter", "_tkinter", "customtkinter"}
+BASELINE_PATH = Path(__file__).with_name("import_baseline.json")
+RUNS = 5
+TOLERANCE = 0.25  # allowed growth over the baseline before the check fails
+TOP = 8
+
+
+def measure(module):
+    """Import module in a fresh interpreter, returns {package: self_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+    )
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    return packages
+
+
+def report(module):
+    """Median over RUNS imports, so one slow disk read does not fail the check"""
+    runs = [measure(module) for _ in range(RUNS)]
+    totals = [sum(run.values()) for run in runs]
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    return statistics.median(totals), dict(median_run)
+
+
+def main():
+    update = "--update" in sys.argv
+    baseline = {}
+    if BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text())
+
+    failed = []
+    current = {}
+    for module in ENTRY_POINTS:
+        total_us, packages = report(module)
+        current[module] = round(total_us / 1000, 1)
+        limit_ms = baseline.get(module, 0) * (1 + TOLERANCE)
+
+        print(f"{module}: {total_us / 1000:.1f} ms", end="")
+        if module in baseline:
+            print(f" (baseline {baseline[module]:.1f} ms, limit {limit_ms:.1f} ms)")
+        else:
+            print(" (no baseline)")
+        for name, us in sorted(packages.items(), key=lambda item: -item[1])[:TOP]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+
+        if not update and module in baseline and total_us / 1000 > limit_ms:
+            failed.append(module)
+        gui = GUI_PACKAGES & packages.keys()
+        if module in HEADLESS and gui:
+            print(f"    imports {', '.join(sorted(gui))}, which a headless entry point must not")
+            failed.append(module)
+
+    if update:
+        BASELINE_PATH.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"baseline written to {BASELINE_PATH.name}")
+        return 0
+    if failed:
+        print(f"FAIL: import check failed for {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,29 @@
 import customtkinter as ctk
 import tkinter as tk
-import tkinter.font as tkFont
 import math
 import os
 from pathlib import Path
 
+from hud_fonts import CUSTOM_FONTS, load_custom_fonts, pooled_font
+from hud_profile import profiler_from_env
+from hud_rules import RULES, side_effects
+from hud_store import load_catalog, load_settings, save_settings
+from hud_sync import SYNC_STAGES, DirtyTracker, SyncEngine, auto_sync_from_env
+from hud_theme import DEFAULT_PALETTE, FRAME_BUDGET_MS, ThemeEngine
+from hud_watchdog import watchdog_from_env
+from virtual_list import VIRTUALIZE_AFTER, VirtualList
+
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")  # Modes: "dark", "light", "system"
 ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
 
-# Load custom fonts
-def load_custom_fonts():
-    """Use modern rounded system fonts"""
-    # Use system fonts that are more rounded and modern
-    fonts = {
-        "regular": "Segoe UI Variable",    # Windows 11's modern variable font
-        "bold": "Segoe UI Variable",       # Same font family for consistency
-        "medium": "Segoe UI Variable"      # Same font family
-    }
-    
-    # Fallback to regular Segoe UI if variable version not available
-    fallback_fonts = {
-        "regular": "Segoe UI",
-        "bold": "Segoe UI",  
-        "medium": "Segoe UI"
-    }
-    
-    # Test if fonts are available, otherwise use fallback
-    try:
-        available_fonts = tkFont.families()
-        
-        for weight in fonts:
-            if fonts[weight] not in available_fonts:
-                fonts[weight] = fallback_fonts[weight]
-                
-    except Exception:
-        fonts = fallback_fonts
-    
-    return fonts
-
-# Load fonts at startup
-CUSTOM_FONTS = load_custom_fonts()
-
 class ModernSwitch(ctk.CTkSwitch):
     """Modern customtkinter switch control with proper callbacks"""
-    def __init__(self, parent, text="", callback=None, **kwargs):
+    def __init__(self, parent, text="", callback=None, is_on=False, palette=DEFAULT_PALETTE, **kwargs):
         # Store callback before calling super().__init__
         self._callback = callback
+        # Start in the saved state instead of toggling after construction
+        kwargs.setdefault("variable", ctk.IntVar(parent, value=1 if is_on else 0))
         super().__init__(parent, text=text, command=self._handle_toggle, **kwargs)
         
         # Configure switch appearance
@@ -57,8 +34,8 @@ class ModernSwitch(ctk.CTkSwitch):
             switch_height=22,
             corner_radius=12,
             border_width=0,
-            fg_color=("#939393", "#525252"),  # Gray when off
-            progress_color=("#32D74B", "#32D74B"),  # Green when on
+            fg_color=palette["switch_off"],  # Gray when off
+            progress_color=palette["switch_on"],  # Green when on
             button_color=("#FFFFFF", "#FFFFFF"),
             text=""
         )
@@ -82,19 +59,20 @@ class ModernSwitch(ctk.CTkSwitch):
 class SettingItem(ctk.CTkFrame):
     """Modern setting item widget using customtkinter"""
     def __init__(self, parent, title, has_switch=True, has_arrow=False, 
-                 status_text="", callback=None, **kwargs):
+                 status_text="", callback=None, is_on=False, palette=DEFAULT_PALETTE, **kwargs):
         super().__init__(parent, **kwargs)
         self.title = title
         self.has_switch = has_switch
         self.has_arrow = has_arrow
         self.status_text = status_text
         self.callback = callback
-        self.is_active = False
+        self.is_active = is_on
+        self.palette = palette
         
         # Configure frame appearance - more compact
         self.configure(
             corner_radius=12,
-            fg_color=("#2b2b2b", "#2b2b2b"),
+            fg_color=palette["card_bg"],
             border_width=0,
             height=55  # Reduced height for better spacing
         )
@@ -110,8 +88,8 @@ class SettingItem(ctk.CTkFrame):
         self.title_label = ctk.CTkLabel(
             self, 
             text=self.title,
-            font=ctk.CTkFont(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=16, weight="bold"),
-            text_color=("#FFFFFF", "#FFFFFF"),
+            font=pooled_font(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=16, weight="bold"),
+            text_color=self.palette["text_primary"],
             anchor="w"
         )
         self.title_label.grid(row=0, column=0, columnspan=2, padx=(20, 10), pady=12, sticky="w")  # Reduced padding
@@ -120,14 +98,15 @@ class SettingItem(ctk.CTkFrame):
             self.status_label = ctk.CTkLabel(
                 self, 
                 text=self.status_text,
-                font=ctk.CTkFont(family=CUSTOM_FONTS.get("regular", "Segoe UI"), size=12),
-                text_color=("#999999", "#999999"),
+                font=pooled_font(family=CUSTOM_FONTS.get("regular", "Segoe UI"), size=12),
+                text_color=self.palette["text_secondary"],
                 anchor="w"
             )
             self.status_label.grid(row=1, column=0, padx=(20, 10), pady=(0, 5), sticky="w")
         
         if self.has_switch:
-            self.switch = ModernSwitch(self, callback=self.on_switch_change)
+            self.switch = ModernSwitch(self, callback=self.on_switch_change, is_on=self.is_active,
+                                       palette=self.palette)
             self.switch.grid(row=0, column=1, padx=(10, 20), pady=12, sticky="e")
         elif self.has_arrow:
             # Create arrow indicator
@@ -140,28 +119,34 @@ class SettingItem(ctk.CTkFrame):
             if self.callback:
                 self.callback(self.title, value)
 
+    def bind_feature(self, title, is_on):
+        """Point a recycled row at another feature without firing callbacks"""
+        self.title = title
+        self.is_active = is_on
+        self.title_label.configure(text=title)
+        self.switch.set_state(is_on)
+
 class HUDApp:
     def __init__(self, root):
         self.root = root
+        # Opt-in stall watchdog (HUD_WATCHDOG), handlers are wrapped before any widget holds them
+        self.watchdog = watchdog_from_env(root)
+        if self.watchdog:
+            self.watchdog.instrument(self, "setup_window", "create_interface", "on_feature_change",
+                                     "change_theme", "sync_settings", "sync_progress", "sync_complete")
+        # Fonts resolve against the real root, cached on disk between runs
+        load_custom_fonts(root)
         self.is_closing = False  # Add flag to track closing state
         self.setup_window()
         
         # Feature configuration
-        self.features = [
-            {"title": "Rear Traffic Alert", "type": "switch"},
-            {"title": "Headlight Status", "type": "switch"},
-            {"title": "Turn Signals", "type": "switch"},
-            {"title": "Navigation", "type": "switch"},
-            {"title": "Speed Limits", "type": "switch"},
-            {"title": "Takeover Alerts", "type": "switch"},
-            {"title": "Lane Departure", "type": "switch"},
-            {"title": "Autopilot Status", "type": "switch"},
-            {"title": "Gear Position", "type": "switch"},
-            {"title": "Battery Range", "type": "switch"},
-            {"title": "Speed Display", "type": "switch"}
-        ]
-        
-        self.feature_states = {feature["title"]: False for feature in self.features}
+        # Codec titles first, in frame bit order, then any HUD_CATALOG extras
+        self.catalog = load_catalog()
+        self.features = [{"title": title, "type": "switch"} for title in self.catalog]
+        
+        # Saved settings are loaded before any widget exists
+        self.settings = load_settings(titles=self.catalog)
+        self.feature_states = self.settings["features"]
         self.setting_items = {}
         
         # Theme configurations optimized for customtkinter
@@ -184,7 +169,17 @@ class HUDApp:
             }
         }
         
-        self.current_theme = "Dark"
+        self.current_theme = self.settings["theme"]
+        
+        # Palettes compile once, widgets are built with the saved theme's colors
+        self.theme = ThemeEngine(self.themes, self.current_theme, on_apply=self.report_theme_timing)
+        
+        # Device link, runs on its own worker thread
+        self.sync_engine = SyncEngine(self.root)
+        self.dirty = DirtyTracker(self.feature_states, self.current_theme,
+                                  self.settings["synced"], self.settings["synced_theme"])
+        # Without a usable device address there is nothing to sync automatically
+        self.auto_sync = None if self.sync_engine.error else auto_sync_from_env(self.root, self.sync_settings)
         
         self.create_interface()
         
@@ -210,13 +205,19 @@ class HUDApp:
         
     def create_interface(self):
         """Create main interface with customtkinter"""
+        palette = self.theme.palette
         # Main scrollable frame
-        self.main_frame = ctk.CTkScrollableFrame(
-            self.root,
-            corner_radius=0,
-            fg_color=("#000000", "#000000"),
-            scrollbar_button_color=("#333333", "#333333"),
-            scrollbar_button_hover_color=("#555555", "#555555")
+        self.main_frame = self.theme.register(
+            ctk.CTkScrollableFrame(
+                self.root,
+                corner_radius=0,
+                fg_color=palette["window_bg"],
+                scrollbar_button_color=palette["scrollbar"],
+                scrollbar_button_hover_color=palette["scrollbar_hover"]
+            ),
+            fg_color="window_bg",
+            scrollbar_button_color="scrollbar",
+            scrollbar_button_hover_color="scrollbar_hover"
         )
         self.main_frame.pack(fill="both", expand=True)
         
@@ -242,42 +243,70 @@ class HUDApp:
         title_label = ctk.CTkLabel(
             header_frame,
             text="HUD Settings",
-            font=ctk.CTkFont(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=28, weight="bold"),
-            text_color=("#FFFFFF", "#FFFFFF")
+            font=pooled_font(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=28, weight="bold"),
+            text_color=self.theme.palette["text_primary"]
         )
         title_label.pack(expand=True)
+        self.theme.register(title_label, text_color="text_primary")
         
     def create_status_section(self):
         """Create status section"""
         status_frame = ctk.CTkFrame(
             self.main_frame,
             corner_radius=12,
-            fg_color=("#1a1a1a", "#1a1a1a"),
+            fg_color=self.theme.palette["panel_bg"],
             height=60
         )
         status_frame.pack(fill="x", padx=20, pady=10)
         status_frame.pack_propagate(False)
         
-        status_label = ctk.CTkLabel(
+        self.status_label = ctk.CTkLabel(
             status_frame,
             text="Configure HUD display settings for target device",
-            font=ctk.CTkFont(family=CUSTOM_FONTS.get("regular", "Segoe UI"), size=14),
-            text_color=("#AAAAAA", "#AAAAAA")
+            font=pooled_font(family=CUSTOM_FONTS.get("regular", "Segoe UI"), size=14),
+            text_color=self.theme.palette["text_secondary"]
         )
-        status_label.pack(expand=True)
+        self.status_label.pack(expand=True)
+        self.theme.register(status_frame, fg_color="panel_bg")
+        self.theme.register(self.status_label, text_color="text_secondary")
         
     def create_settings_section(self):
         """Create settings section with all HUD features"""
-        # Settings container
-        for i, feature in enumerate(self.features):
-            setting_item = SettingItem(
+        switch_titles = [feature["title"] for feature in self.features if feature["type"] == "switch"]
+        if len(switch_titles) > VIRTUALIZE_AFTER:
+            # Large catalogs only build rows for the viewport and recycle them
+            self.settings_list = VirtualList(
                 self.main_frame,
-                title=feature["title"],
-                has_switch=True,
-                callback=self.on_feature_change
+                switch_titles,
+                row_factory=lambda parent: self.create_setting_item(parent, ""),
+                bind_row=lambda item, title: item.bind_feature(title, self.feature_states[title]),
+                row_height=55,
+                row_gap=4,
+                fg_color="transparent"
             )
-            setting_item.pack(fill="x", padx=20, pady=2)
-            self.setting_items[feature["title"]] = setting_item
+            self.settings_list.pack(fill="x", padx=20, pady=2)
+        else:
+            self.settings_list = None
+            # Settings container
+            for title in switch_titles:
+                setting_item = self.create_setting_item(self.main_frame, title, self.feature_states[title])
+                setting_item.pack(fill="x", padx=20, pady=2)
+                self.setting_items[title] = setting_item
+        
+    def create_setting_item(self, parent, title, is_on=False):
+        """Build a themed switch row"""
+        setting_item = SettingItem(
+            parent,
+            title=title,
+            has_switch=True,
+            callback=self.on_feature_change,
+            is_on=is_on,
+            palette=self.theme.palette
+        )
+        self.theme.register(setting_item, fg_color="card_bg")
+        self.theme.register(setting_item.title_label, text_color="text_primary")
+        self.theme.register(setting_item.switch, fg_color="switch_off", progress_color="switch_on")
+        return setting_item
         
     def create_theme_section(self):
         """Create theme selection section"""
@@ -285,19 +314,21 @@ class HUDApp:
         theme_header = ctk.CTkLabel(
             self.main_frame,
             text="Theme",
-            font=ctk.CTkFont(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=18, weight="bold"),
-            text_color=("#FFFFFF", "#FFFFFF"),
+            font=pooled_font(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=18, weight="bold"),
+            text_color=self.theme.palette["text_primary"],
             anchor="w"
         )
         theme_header.pack(fill="x", padx=20, pady=(20, 10))
+        self.theme.register(theme_header, text_color="text_primary")
         
         # Theme buttons frame
         theme_frame = ctk.CTkFrame(
             self.main_frame,
             corner_radius=12,
-            fg_color=("#1a1a1a", "#1a1a1a")
+            fg_color=self.theme.palette["panel_bg"]
         )
         theme_frame.pack(fill="x", padx=20, pady=5)
+        self.theme.register(theme_frame, fg_color="panel_bg")
         
         # Theme buttons
         self.theme_buttons = {}
@@ -305,7 +336,7 @@ class HUDApp:
             btn = ctk.CTkButton(
                 theme_frame,
                 text=theme_name,
-                font=ctk.CTkFont(family=CUSTOM_FONTS.get("medium", "Segoe UI"), size=14),
+                font=pooled_font(family=CUSTOM_FONTS.get("medium", "Segoe UI"), size=14),
                 corner_radius=8,
                 height=35,
                 command=lambda t=theme_name: self.change_theme(t)
@@ -318,6 +349,8 @@ class HUDApp:
             theme_frame.grid_columnconfigure(i, weight=1)
             
         self.update_theme_buttons()
+        # Button colors depend on the selection as well as the theme
+        self.theme.add_painter(self.update_theme_buttons)
         
     def create_sync_section(self):
         """Create sync section"""
@@ -325,14 +358,21 @@ class HUDApp:
         self.sync_button = ctk.CTkButton(
             self.main_frame,
             text="Sync to Device",
-            font=ctk.CTkFont(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=16, weight="bold"),
+            font=pooled_font(family=CUSTOM_FONTS.get("bold", "Segoe UI"), size=16, weight="bold"),
             corner_radius=12,
             height=50,
-            fg_color=("#007AFF", "#007AFF"),
-            hover_color=("#0051D5", "#0051D5"),
+            fg_color=self.theme.palette["accent"],
+            hover_color=self.theme.palette["accent_hover"],
             command=self.sync_settings
         )
-        self.sync_button.pack(fill="x", padx=20, pady=20)
+        self.theme.register(self.sync_button, fg_color="accent", hover_color="accent_hover")
+        # Auto-sync replaces the manual button
+        if not self.auto_sync:
+            self.sync_button.pack(fill="x", padx=20, pady=20)
+        if self.sync_engine.error:
+            # Nothing to sync to until HUD_DEVICE is fixed
+            self.sync_button.configure(state="disabled")
+            self.status_label.configure(text=f"Sync off - {self.sync_engine.error}", wraplength=360)
         
         # Add some bottom spacing
         spacer = ctk.CTkFrame(
@@ -345,37 +385,107 @@ class HUDApp:
         
     def on_feature_change(self, feature_name, is_on):
         """Handle feature toggle"""
-        self.feature_states[feature_name] = is_on
-        print(f"{feature_name}: {'ON' if is_on else 'OFF'}")
+        changes, broken = RULES.toggle(self.feature_states, feature_name, is_on)
+        if broken:
+            # Rejected, the switch goes back to where it was
+            self.update_feature_switches([feature_name])
+            print(f"{feature_name}: not changed, {broken[0]}")
+            return
+        for title, on in changes.items():
+            self.feature_states[title] = on
+            self.dirty.mark(title)
+        self.update_feature_switches([title for title in changes if title != feature_name])
+        if self.auto_sync:
+            self.auto_sync.poke()
+        print(f"{feature_name}: {'ON' if is_on else 'OFF'}{side_effects(changes, feature_name)}")
+        
+    def update_feature_switches(self, titles):
+        """Move switches to match feature_states after a rule changed them"""
+        if not titles:
+            return
+        if self.settings_list is not None:
+            self.settings_list.refresh(set(titles))
+            return
+        for title in titles:
+            self.setting_items[title].bind_feature(title, self.feature_states[title])
         
     def change_theme(self, theme_name):
         """Change application theme"""
         self.current_theme = theme_name
-        theme_config = self.themes[theme_name]
-        ctk.set_appearance_mode(theme_config["appearance_mode"])
-        ctk.set_default_color_theme(theme_config["color_theme"])
-        self.update_theme_buttons()
+        self.dirty.mark_theme(theme_name)
+        if self.auto_sync:
+            self.auto_sync.poke()
+        # Repaint only widgets whose colors differ between the two themes
+        self.theme.apply(theme_name)
         
-    def update_theme_buttons(self):
+    def update_theme_buttons(self, palette=None):
         """Update theme button appearances"""
+        palette = palette or self.theme.palette
         for theme_name, button in self.theme_buttons.items():
             if theme_name == self.current_theme:
-                button.configure(fg_color=("#007AFF", "#007AFF"))
+                colors = {"fg_color": palette["accent"], "hover_color": palette["accent_hover"],
+                          "text_color": "#FFFFFF"}
             else:
-                button.configure(fg_color=("#333333", "#333333"))
+                colors = {"fg_color": palette["button_idle"], "hover_color": palette["scrollbar_hover"],
+                          "text_color": palette["button_text"]}
+            # Skip buttons that already look right
+            changed = {option: color for option, color in colors.items() if button.cget(option) != color}
+            if changed:
+                button.configure(**changed)
+        
+    def report_theme_timing(self, theme_name, elapsed_ms, widget_count):
+        """Timing hook for theme switches"""
+        budget = "" if elapsed_ms <= FRAME_BUDGET_MS else f" - over the {FRAME_BUDGET_MS:.1f} ms frame budget"
+        print(f"Theme {theme_name}: {widget_count} widgets repainted in {elapsed_ms:.1f} ms{budget}")
         
     def sync_settings(self):
         """Sync settings to device"""
         self.sync_button.configure(text="Syncing...", state="disabled")
-        # Simulate sync process
-        self.root.after(2000, self.sync_complete)
+        # Push to the device off the Tk thread, sync_complete gets the result
+        self.sync_engine.sync(self.feature_states, self.current_theme, self.sync_complete,
+                              delta=self.dirty.delta(), progress=self.sync_progress)
+        
+    def sync_progress(self, stage):
+        """Show where the running sync is on the button"""
+        self.sync_button.configure(text=SYNC_STAGES[stage])
         
-    def sync_complete(self):
+    def sync_complete(self, result):
         """Complete sync process"""
         self.sync_button.configure(text="Sync to Device", state="normal")
-        print("Settings synced successfully!")
+        if self.auto_sync:
+            self.auto_sync.done(result.ok)
+        if result.ok:
+            self.dirty.acknowledge(result.payload)
+            self.persist_settings()
+            print(f"Settings synced successfully! ({result.summary or 'device acked'}, {result.elapsed * 1000:.0f} ms)")
+        else:
+            print(f"Sync failed: {result.error}")
+            
+    def persist_settings(self):
+        """Save settings and the last synced snapshot"""
+        try:
+            save_settings(self.feature_states, self.current_theme,
+                          self.dirty.acked, self.dirty.acked_theme)
+        except OSError as e:
+            print(f"Could not save settings: {e}")
+            
+    def on_closing(self):
+        """Save settings, stop the sync worker and close the window"""
+        self.persist_settings()
+        self.is_closing = True
+        if self.auto_sync:
+            self.auto_sync.cancel()
+        self.sync_engine.close()
+        if self.watchdog:
+            self.watchdog.stop()
+        self.root.destroy()
 
 def main():
+    # Opt-in startup profile, HUD_PROFILE=dir or --profile
+    profiler = profiler_from_env("main_clean")
+    if profiler:
+        profiler.start(HUDApp, "create_interface")
+    
     # Create main window
     root = ctk.CTk()
     app = HUDApp(root)
@@ -387,6 +497,8 @@ def main():
     x = (root.winfo_screenwidth() // 2) - (width // 2)
     y = (root.winfo_screenheight() // 2) - (height // 2)
     root.geometry(f"{width}x{height}+{x}+{y}")
+    if profiler:
+        profiler.stop()
     
     root.mainloop()
 
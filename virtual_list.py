@@ -0,0 +1,107 @@
+import tkinter as tk
+
+import customtkinter as ctk
+
+# Lists longer than this are virtualized, shorter ones are built in full
+VIRTUALIZE_AFTER = 30
+
+
+class VirtualList(ctk.CTkFrame):
+    """Scrolling list that only builds rows for the visible viewport
+
+    A fixed pool of rows (viewport plus overscan on each side) is placed in
+    a clipped frame. Item i always lands in pool slot i % len(pool), so a
+    scroll step only rebinds the rows that wrap from one edge to the other,
+    through bind_row(row, item).
+    """
+    def __init__(self, parent, items, row_factory, bind_row, row_height,
+                 visible_rows=8, overscan=2, row_gap=1, **kwargs):
+        super().__init__(parent, height=(row_height + row_gap) * visible_rows,
+                         corner_radius=0, **kwargs)
+        self.items = items
+        self.bind_row = bind_row
+        self.stride = row_height + row_gap
+        self.visible_rows = visible_rows
+        self.overscan = overscan
+        self.offset = 0
+        self.pack_propagate(False)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        # Rows are placed in the body, which clips the ones scrolled out of view
+        self.body = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+
+        pool_size = min(len(items), visible_rows + 1 + 2 * overscan)
+        self.rows = [row_factory(self.body) for _ in range(pool_size)]
+        self.bound = [None] * pool_size
+        self._bind_wheel(self.body)
+
+        self.body.bind("<Configure>", lambda event: self._layout(), add="+")
+        self._layout()
+
+    @property
+    def viewport(self):
+        """Visible height in unscaled units, the same units place() takes"""
+        if self.body.winfo_ismapped():
+            return self.body.winfo_height() / self._get_widget_scaling()
+        return self.stride * self.visible_rows
+
+    def refresh(self, changed=None):
+        """Rebind the rows showing an item in changed, or every row when None
+
+        For when item data changed outside the list.
+        """
+        if changed is None:
+            self.bound = [None] * len(self.rows)
+        else:
+            self.bound = [None if index is not None and self.items[index] in changed else index
+                          for index in self.bound]
+        self._layout()
+
+    def yview(self, *args):
+        """Scrollbar protocol: moveto fraction, or scroll n units/pages"""
+        total = len(self.items) * self.stride
+        if args[0] == "moveto":
+            self.offset = float(args[1]) * total
+        elif args[0] == "scroll":
+            step = self.stride if args[2] == "units" else self.viewport
+            self.offset += int(args[1]) * step
+        self.offset = int(max(0, min(self.offset, total - self.viewport)))
+        self._layout()
+
+    def _layout(self):
+        if not self.rows:
+            return
+        pool_size = len(self.rows)
+        first = max(0, self.offset // self.stride - self.overscan)
+        last = min(len(self.items), first + pool_size)
+        first = max(0, last - pool_size)
+
+        for index in range(first, last):
+            slot = index % pool_size
+            row = self.rows[slot]
+            if self.bound[slot] != index:
+                self.bind_row(row, self.items[index])
+                self.bound[slot] = index
+            # Rows outside the frame are clipped by Tk, overscan rows wait there
+            row.place(x=0, y=index * self.stride - self.offset, relwidth=1)
+
+        total = len(self.items) * self.stride
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.viewport) / total))
+
+    def _bind_wheel(self, widget):
+        """Scroll this list, not the outer scrollable frame, under the pointer"""
+        tk.Misc.bind(widget, "<MouseWheel>", self._on_wheel, add="+")
+        tk.Misc.bind(widget, "<Button-4>", self._on_wheel, add="+")
+        tk.Misc.bind(widget, "<Button-5>", self._on_wheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -1, "units")
+        else:
+            self.yview("scroll", 1, "units")
+        return "break"